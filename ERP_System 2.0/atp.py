@@ -1,9 +1,49 @@
 from __future__ import annotations
 
+from collections.abc import Iterable, Mapping
+
+import numpy as np
 import pandas as pd
 
+# item -> (sorted unique dates, FutureMin_NAV at each date)
+AtpIndex = dict[str, tuple[np.ndarray, np.ndarray]]
+
+
+def _future_min_python(df: pd.DataFrame) -> pd.Series:
+    """Reference engine: per-item Python loop (kept for benchmarking)."""
+    # Reverse within each item, run cumulative min, then flip back
+    def _future_min(group: pd.DataFrame) -> pd.Series:
+        vals = group["Projected_NAV"].values[::-1]
+        out = []
+        current_min = float("inf")
+        for v in vals:
+            if pd.isna(v):
+                current_min = min(current_min, float("inf"))
+            else:
+                current_min = min(current_min, float(v))
+            out.append(current_min)
+        out = out[::-1]
+        return pd.Series(out, index=group.index)
+
+    return df.groupby("Item", group_keys=False)[["Projected_NAV"]].apply(_future_min)
+
 
-def build_atp_view(ledger: pd.DataFrame) -> pd.DataFrame:
+def _future_min_vectorized(df: pd.DataFrame) -> pd.Series:
+    """
+    Segmented backward cumulative min over (Item, Date)-sorted rows.
+
+    NaN never lowers the running min, so it is treated as +inf; an item
+    whose remaining rows are all NaN yields inf, like the Python engine.
+    """
+    nav = df["Projected_NAV"].to_numpy(dtype=float, na_value=np.nan)
+    nav = np.where(np.isnan(nav), np.inf, nav)
+    rev = pd.Series(nav[::-1])
+    items_rev = pd.Series(df["Item"].to_numpy()[::-1])
+    out = rev.groupby(items_rev, sort=False).cummin().to_numpy()[::-1]
+    return pd.Series(out, index=df.index)
+
+
+def build_atp_view(ledger: pd.DataFrame, *, engine: str = "vectorized") -> pd.DataFrame:
     """
     Build an ATP-ready view from the ledger.
 
@@ -20,7 +60,13 @@ def build_atp_view(ledger: pd.DataFrame) -> pd.DataFrame:
 
     Rows with missing Item or Date are dropped.
     Pseudo-items whose name starts with 'Total ' are excluded.
+
+    `engine` selects the FutureMin_NAV implementation: "vectorized"
+    (default) or "python" (the original per-row loop, same output).
     """
+    if engine not in ("vectorized", "python"):
+        raise ValueError("engine must be 'vectorized' or 'python'.")
+
     if ledger is None or ledger.empty:
         return pd.DataFrame(columns=["Item", "Date", "Projected_NAV", "FutureMin_NAV"])
 
@@ -43,21 +89,10 @@ def build_atp_view(ledger: pd.DataFrame) -> pd.DataFrame:
     # Sort ascending by date, then compute backward cumulative min per item
     df.sort_values(["Item", "Date"], inplace=True)
 
-    # Reverse within each item, run cumulative min, then flip back
-    def _future_min(group: pd.DataFrame) -> pd.Series:
-        vals = group["Projected_NAV"].values[::-1]
-        out = []
-        current_min = float("inf")
-        for v in vals:
-            if pd.isna(v):
-                current_min = min(current_min, float("inf"))
-            else:
-                current_min = min(current_min, float(v))
-            out.append(current_min)
-        out = out[::-1]
-        return pd.Series(out, index=group.index)
-
-    df["FutureMin_NAV"] = df.groupby("Item", group_keys=False).apply(_future_min)
+    if engine == "python":
+        df["FutureMin_NAV"] = _future_min_python(df)
+    else:
+        df["FutureMin_NAV"] = _future_min_vectorized(df)
 
     # Final column selection / ordering
     atp_view = df.loc[:, ["Item", "Date", "Projected_NAV", "FutureMin_NAV"]].copy()
@@ -112,8 +147,139 @@ def earliest_atp_strict(
     return candidates.min()
 
 
+def _from_date64(from_date) -> np.datetime64:
+    if from_date is None:
+        from_date = pd.Timestamp.today().normalize()
+    else:
+        from_date = pd.to_datetime(from_date).normalize()
+    return np.datetime64(from_date, "ns")
+
+
+def _earliest_in_entry(
+    entry: tuple[np.ndarray, np.ndarray] | None,
+    qty: float,
+    start_date: np.datetime64,
+    side: str,
+) -> pd.Timestamp | None:
+    if entry is None:
+        return None
+    dates, future_min = entry
+    start = int(np.searchsorted(dates, start_date, side="left"))
+    pos = start + int(np.searchsorted(future_min[start:], float(qty), side=side))
+    if pos >= len(dates):
+        return None
+    return pd.Timestamp(dates[pos])
+
+
+def build_atp_index(atp_view: pd.DataFrame) -> AtpIndex:
+    """
+    Pre-group an ATP view into a per-item lookup structure.
+
+    Returns {item: (dates, future_min)} where `dates` is a sorted
+    datetime64[ns] array of the item's unique dates and `future_min` holds
+    the FutureMin_NAV reached on that date (the largest value among rows
+    sharing the date, i.e. the one after all same-day events).
+
+    FutureMin_NAV is a backward cumulative min, so `future_min` is
+    non-decreasing and the earliest feasible date for a quantity is a
+    binary search instead of a full-frame scan.
+    """
+    if atp_view is None or atp_view.empty:
+        return {}
+    if not {"Item", "Date", "FutureMin_NAV"}.issubset(atp_view.columns):
+        raise ValueError("atp_view must contain 'Item', 'Date', and 'FutureMin_NAV' columns.")
+
+    df = pd.DataFrame({
+        "Item": atp_view["Item"].astype(str),
+        "Date": pd.to_datetime(atp_view["Date"], errors="coerce"),
+        "FutureMin_NAV": pd.to_numeric(atp_view["FutureMin_NAV"], errors="coerce"),
+    }).dropna(subset=["Date", "FutureMin_NAV"])
+    if df.empty:
+        return {}
+
+    per_date = df.groupby(["Item", "Date"], sort=True)["FutureMin_NAV"].max()
+    items = per_date.index.get_level_values(0).to_numpy(dtype=object)
+    dates = per_date.index.get_level_values(1).to_numpy(dtype="datetime64[ns]")
+    values = per_date.to_numpy(dtype=float)
+
+    # Item boundaries of the (Item, Date)-sorted arrays
+    starts = np.flatnonzero(np.r_[True, items[1:] != items[:-1]])
+    ends = np.r_[starts[1:], len(items)]
+    return {
+        items[s]: (dates[s:e], values[s:e])
+        for s, e in zip(starts, ends)
+    }
+
+
+def earliest_atp_from_index(
+    atp_index: AtpIndex,
+    item: str,
+    qty: float,
+    from_date: pd.Timestamp | None = None,
+    *,
+    allow_zero: bool = True,
+) -> pd.Timestamp | None:
+    """
+    Same answer as `earliest_atp_strict`, answered from `build_atp_index`
+    output with a dictionary lookup and two binary searches.
+    """
+    if not atp_index:
+        return None
+    side = "left" if allow_zero else "right"
+    return _earliest_in_entry(atp_index.get(str(item)), qty, _from_date64(from_date), side)
+
+
+def earliest_atp_for_lines(
+    atp_index: AtpIndex,
+    demands: Mapping[str, float] | Iterable[tuple[str, float]],
+    from_date: pd.Timestamp | None = None,
+    *,
+    allow_zero: bool = True,
+) -> dict[str, pd.Timestamp | None]:
+    """
+    Per-item earliest ATP dates for a batch of (item, qty) demands.
+
+    Quantities of repeated items are summed first, since two lines of the
+    same part draw on the same projected stock. Returns {item: date or None}.
+    """
+    pairs = demands.items() if isinstance(demands, Mapping) else demands
+    totals: dict[str, float] = {}
+    for itm, qty in pairs:
+        key = str(itm)
+        totals[key] = totals.get(key, 0.0) + float(qty)
+
+    start_date = _from_date64(from_date)
+    side = "left" if allow_zero else "right"
+    return {
+        itm: _earliest_in_entry(atp_index.get(itm), qty, start_date, side)
+        for itm, qty in totals.items()
+    }
+
+
+def earliest_atp_for_quotes(
+    atp_index: AtpIndex,
+    quotes: Mapping[str, Mapping[str, float] | Iterable[tuple[str, float]]],
+    from_date: pd.Timestamp | None = None,
+    *,
+    allow_zero: bool = True,
+) -> dict[str, tuple[pd.Timestamp | None, dict[str, pd.Timestamp | None]]]:
+    """
+    Answer many quotes against one index.
+
+    Returns {quote_id: (quote_date, {item: item_date})}; `quote_date` is
+    the max of the item dates, or None if any item has no feasible date.
+    """
+    out = {}
+    for quote_id, demands in quotes.items():
+        lines = earliest_atp_for_lines(atp_index, demands, from_date, allow_zero=allow_zero)
+        dates = list(lines.values())
+        quote_date = None if not dates or any(d is None for d in dates) else max(dates)
+        out[quote_id] = (quote_date, lines)
+    return out
+
+
 def earliest_atp_for_items_strict(
-    atp_view: pd.DataFrame,
+    atp_view: pd.DataFrame | AtpIndex,
     demands: dict[str, float],
     from_date: pd.Timestamp | None = None,
     *,
@@ -128,24 +294,23 @@ def earliest_atp_for_items_strict(
       - For each (item, qty), compute its own earliest ATP date.
       - If any item has no feasible date -> return None.
       - Otherwise, return max of all item dates.
+
+    `atp_view` may also be a prebuilt `build_atp_index` result; a frame is
+    indexed once (restricted to the demanded items) instead of being
+    scanned per line.
     """
     if not demands:
         return None
 
-    dates: list[pd.Timestamp] = []
-    for itm, qty in demands.items():
-        d = earliest_atp_strict(
-            atp_view=atp_view,
-            item=itm,
-            qty=qty,
-            from_date=from_date,
-            allow_zero=allow_zero,
-        )
-        if d is None:
-            return None
-        dates.append(d)
-
-    if not dates:
+    if isinstance(atp_view, dict):
+        atp_index = atp_view
+    elif atp_view is None or atp_view.empty:
         return None
-    return max(dates)
+    else:
+        wanted = atp_view["Item"].astype(str).isin([str(i) for i in demands])
+        atp_index = build_atp_index(atp_view.loc[wanted])
 
+    quote_date, _ = earliest_atp_for_quotes(
+        atp_index, {"quote": demands}, from_date, allow_zero=allow_zero
+    )["quote"]
+    return quote_date
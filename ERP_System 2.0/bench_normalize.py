@@ -0,0 +1,98 @@
+"""
+Benchmark erp_normalize.normalize_series against the per-row apply.
+
+Reads the distinct parts from Item Listing.CSV (~4k names), adds a few
+JetPack variants and blanks, repeats them to --rows (default 5M) in random
+order, then times the vectorized normalizer (cold and warm memo) and the
+old unmemoized per-row apply (reproduced below) and checks both agree.
+
+    python bench_normalize.py [--rows 5000000] [--listing "../Item Listing.CSV"] [--skip-apply]
+"""
+from __future__ import annotations
+
+import argparse
+import time
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+import erp_normalize
+from erp_normalize import ITEM_MAPPINGS, PATTERN_MAPPINGS, normalize_series
+
+DEFAULT_LISTING = Path(__file__).resolve().parent.parent / "Item Listing.CSV"
+
+
+def baseline_normalize_item(value):
+    """normalize_item as it was before normalize_series was vectorized (no memo, patterns in turn)."""
+    if value is None:
+        return value
+    try:
+        if pd.isna(value):
+            return value
+    except Exception:
+        pass
+    name = str(value).strip()
+    if not name:
+        return name
+    direct = ITEM_MAPPINGS.get(name)
+    if direct:
+        return direct
+    for pattern, replacement in PATTERN_MAPPINGS:
+        if pattern.match(name):
+            return ITEM_MAPPINGS.get(replacement, replacement)
+    return name
+
+
+def synthetic_items(listing: Path, rows: int, seed: int = 0) -> pd.Series:
+    items = pd.read_csv(listing, usecols=["Item"], dtype=str, encoding_errors="ignore")["Item"]
+    extra = [
+        "GC-Jetson-AGX64G-Orin-Nvidia JetPack 6.0",
+        "GC-Jetson-NX16G-Orin-Nvidia-JetPack_5.1.2",
+        " M.242-SSD-128GB-PCIe34-TLC5WT-T ",
+        "",
+        np.nan,
+    ]
+    vocab = pd.concat([items, pd.Series(extra, dtype=object)], ignore_index=True).to_numpy(dtype=object)
+    rng = np.random.default_rng(seed)
+    return pd.Series(vocab[rng.integers(0, len(vocab), size=rows)], name="Item")
+
+
+def _timed(fn, series: pd.Series) -> tuple[pd.Series, float]:
+    t0 = time.perf_counter()
+    out = fn(series)
+    return out, time.perf_counter() - t0
+
+
+def main():
+    ap = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    ap.add_argument("--rows", type=int, default=5_000_000)
+    ap.add_argument("--listing", type=Path, default=DEFAULT_LISTING)
+    ap.add_argument("--skip-apply", action="store_true", help="only time normalize_series")
+    args = ap.parse_args()
+
+    items = synthetic_items(args.listing, args.rows)
+    print(f"items: {len(items):,} rows, {items.nunique():,} distinct")
+
+    erp_normalize.clear_normalize_cache()
+    vec, t_cold = _timed(normalize_series, items)
+    print(f"normalize_series (cold): {t_cold:8.2f}s")
+    _, t_warm = _timed(normalize_series, items)
+    print(f"normalize_series (warm): {t_warm:8.2f}s")
+    _, t_cat = _timed(normalize_series, items.astype("category"))
+    print(f"normalize_series (cat):  {t_cat:8.2f}s")
+
+    if args.skip_apply:
+        return
+    ref, t_apply = _timed(lambda s: s.apply(baseline_normalize_item), items)
+    print(f"apply (old, per row):    {t_apply:8.2f}s  ({t_apply / t_warm:.0f}x slower than warm)")
+
+    pd.testing.assert_series_equal(vec, ref)
+    # Cells that hash equal but print differently must not share a result
+    mixed = pd.Series([1, 1.0, True, "1", -0.0, 0.0, None, np.nan], dtype=object)
+    pd.testing.assert_series_equal(normalize_series(mixed), mixed.apply(baseline_normalize_item))
+    print("outputs identical")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,177 @@
+"""
+Benchmark pdf_file_log filename lookups before and after pdf_log_schema.
+
+Seeds a scratch table (default erp_bench.pdf_file_log, 100k rows) with file
+names shaped like the real ones ("SO-20250975.pdf", "20250975_PO123.pdf",
+"Order 20250975 rev1.PDF", scanner names without an SO), then times the web
+server's lookups:
+
+  - newest file whose name contains an SO number (ILIKE '%SO-2025xxxx%')
+  - free-text substring search (ILIKE '%PO12%', 50 rows)
+  - newest file by so_key or ILIKE (after migrating; the server's SO lookup)
+
+and checks that the server's batched lookup (NEWEST_FOR_KEYS_SQL) picks the
+same file as the single-key one, including for an SO whose older file
+matches on so_key and whose newer one only by name.
+
+Runs against DATABASE_DSN (or --dsn); the scratch schema is dropped at the
+end unless --keep is given. Nothing outside it is touched.
+
+    python bench_pdf_search.py [--rows 100000] [--lookups 200] [--dsn ...] [--keep]
+"""
+from __future__ import annotations
+
+import argparse
+import random
+import time
+
+from sqlalchemy import create_engine, text
+
+from pdf_log_schema import NEWEST_FOR_KEYS_SQL, apply_migrations, so_key_for, so_key_for_query
+
+BENCH_SCHEMA = "erp_bench"
+BENCH_TABLE = f"{BENCH_SCHEMA}.pdf_file_log"
+
+SEED_SQL = f"""
+    INSERT INTO {BENCH_TABLE} (order_id, file_name, file_path, extracted_data)
+    SELECT (20240000 + n % 20000)::text,
+           CASE n % 4
+               WHEN 0 THEN 'SO-' || (20240000 + n % 20000) || '.pdf'
+               WHEN 1 THEN (20240000 + n % 20000) || '_PO' || n || '.pdf'
+               WHEN 2 THEN 'Order ' || (20240000 + n % 20000) || ' rev' || n % 3 || '.PDF'
+               ELSE 'scan_' || md5(n::text) || '.pdf'
+           END,
+           '/pdfs/' || n || '.pdf',
+           '{{"items": []}}'::jsonb
+    FROM generate_series(1, :rows) AS n
+"""
+
+
+def seed(engine, rows: int):
+    with engine.begin() as con:
+        con.execute(text(f"DROP SCHEMA IF EXISTS {BENCH_SCHEMA} CASCADE"))
+        con.execute(text(f"CREATE SCHEMA {BENCH_SCHEMA}"))
+        con.execute(text(
+            f"CREATE TABLE {BENCH_TABLE} (id serial PRIMARY KEY, order_id text, "
+            "file_name text, file_path text, extracted_data jsonb)"
+        ))
+        con.execute(text(SEED_SQL), {"rows": rows})
+    with engine.connect().execution_options(isolation_level="AUTOCOMMIT") as con:
+        con.execute(text(f"VACUUM ANALYZE {BENCH_TABLE}"))
+
+
+def _timed(engine, sql: str, params: list[dict]) -> tuple[float, list]:
+    stmt = text(sql)
+    out = []
+    with engine.connect() as con:
+        t0 = time.perf_counter()
+        for p in params:
+            out.append(con.execute(stmt, p).scalars().all())
+        elapsed = time.perf_counter() - t0
+    return elapsed / max(len(params), 1), out
+
+
+def run_queries(engine, so_nums: list[str], terms: list[str], *, so_key: bool) -> dict[str, tuple[float, list]]:
+    res = {
+        "ILIKE newest per SO": _timed(
+            engine,
+            f"SELECT id FROM {BENCH_TABLE} WHERE file_name ILIKE :q ORDER BY id DESC LIMIT 1",
+            [{"q": f"%{s}%"} for s in so_nums],
+        ),
+        "ILIKE search (50 rows)": _timed(
+            engine,
+            f"SELECT id FROM {BENCH_TABLE} WHERE file_name ILIKE :q ORDER BY id DESC LIMIT 50",
+            [{"q": f"%{t}%"} for t in terms],
+        ),
+    }
+    if so_key:
+        # What the server runs for an SO query: so_key hits plus the ILIKE ones
+        res["so_key OR ILIKE newest per SO"] = _timed(
+            engine,
+            f"SELECT id FROM {BENCH_TABLE} WHERE so_key = :k OR file_name ILIKE :q ORDER BY id DESC LIMIT 1",
+            [{"k": s, "q": f"%{s}%"} for s in so_nums],
+        )
+    return res
+
+
+def check_batched(engine, so_nums: list[str]) -> list[str]:
+    """
+    Keys whose newest file differs between the batched lookup and the
+    single-key one. First adds two files for one SO: an older one found by
+    so_key and a newer one only ILIKE finds (the SO is its second number).
+    """
+    so_num = "SO-20279990"
+    insert = text(
+        f"INSERT INTO {BENCH_TABLE} (order_id, file_name, file_path, extracted_data) "
+        "VALUES ('20279990', :name, '/pdfs/check.pdf', '{}'::jsonb) RETURNING id"
+    )
+    with engine.begin() as con:
+        con.execute(insert, {"name": f"{so_num}.pdf"})
+        newer = con.execute(insert, {"name": f"SO-20279991 and {so_num}.pdf"}).scalar_one()
+    keys = sorted(set(so_nums) | {so_num})
+    single = text(f"SELECT id FROM {BENCH_TABLE} WHERE so_key = :k OR file_name ILIKE :q ORDER BY id DESC LIMIT 1")
+    with engine.connect() as con:
+        params = {"keys": keys, "so_keys": [so_key_for_query(k) for k in keys]}
+        batched = dict(con.execute(text(NEWEST_FOR_KEYS_SQL.replace("{table}", BENCH_TABLE)), params).all())
+        one = {k: con.execute(single, {"k": so_key_for_query(k), "q": f"%{k}%"}).scalar() for k in keys}
+    bad = [k for k in keys if batched.get(k) != one[k]]
+    if one[so_num] != newer:
+        bad.append(so_num)
+    return bad
+
+
+def main():
+    ap = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    ap.add_argument("--rows", type=int, default=100_000)
+    ap.add_argument("--lookups", type=int, default=200)
+    ap.add_argument("--dsn", help="defaults to DATABASE_DSN")
+    ap.add_argument("--keep", action="store_true", help=f"keep the {BENCH_SCHEMA} schema afterwards")
+    args = ap.parse_args()
+
+    if args.dsn:
+        engine = create_engine(args.dsn)
+    else:
+        from db_config import get_engine
+        engine = get_engine()
+
+    t0 = time.perf_counter()
+    seed(engine, args.rows)
+    print(f"seeded {args.rows:,} rows in {time.perf_counter() - t0:.1f}s")
+
+    rng = random.Random(0)
+    # ~10% of the SO numbers have no file at all (worst case: full scan without an index)
+    so_nums = [f"SO-{rng.randint(20240000, 20261999)}" for _ in range(args.lookups)]
+    terms = [f"PO{rng.randint(1, 999)}" for _ in range(max(args.lookups // 10, 1))]
+
+    try:
+        before = run_queries(engine, so_nums, terms, so_key=False)
+
+        t0 = time.perf_counter()
+        applied = apply_migrations(engine, BENCH_TABLE)
+        print(f"migrations applied in {time.perf_counter() - t0:.1f}s: {', '.join(applied)}")
+        with engine.connect().execution_options(isolation_level="AUTOCOMMIT") as con:
+            con.execute(text(f"ANALYZE {BENCH_TABLE}"))
+            names = con.execute(text(f"SELECT file_name, so_key FROM {BENCH_TABLE}")).all()
+        mismatched = sum(so_key_for(name) != key for name, key in names)
+        print(f"so_key vs core.normalize_wo_number rule: {mismatched} mismatches")
+
+        after = run_queries(engine, so_nums, terms, so_key=True)
+
+        print(f"{'query':30s} {'before':>10s} {'after':>10s}   per lookup")
+        for name, (t_after, rows_after) in after.items():
+            t_before, rows_before = before.get(name, (None, None))
+            shown = f"{t_before * 1e3:8.2f}ms" if t_before is not None else f"{'-':>10s}"
+            print(f"{name:30s} {shown} {t_after * 1e3:8.2f}ms")
+            if rows_before is not None and rows_before != rows_after:
+                print(f"  !! {name}: results differ after migrating")
+
+        bad = check_batched(engine, so_nums)
+        print(f"batched vs single-key lookup: {len(bad)} mismatches" + (f" !! {bad[:5]}" if bad else ""))
+    finally:
+        if not args.keep:
+            with engine.begin() as con:
+                con.execute(text(f"DROP SCHEMA IF EXISTS {BENCH_SCHEMA} CASCADE"))
+
+
+if __name__ == "__main__":
+    main()
@@ -1,14 +1,17 @@
 from __future__ import annotations
 import re, numpy as np, pandas as pd
-from erp_normalize import normalize_item
+from erp_normalize import normalize_series
 
 # ---------- small utils ----------
+# 8-digit WO/SO number starting with the year; pdf_log_schema mirrors it in SQL
+WO_NUMBER_RE = re.compile(r'\b(20\d{6})\b')
+
 def normalize_wo_number(wo: str) -> str:
     """
     Normalize a Work Order number by extracting the 8-digit number starting with year (e.g. "SO-20250975")
     and returning it in the format "SO-<year><number>".
     """
-    m = re.search(r'\b(20\d{6})\b', str(wo))
+    m = WO_NUMBER_RE.search(str(wo))
     return f"SO-{m.group(1)}" if m else str(wo)
 
 
@@ -59,7 +62,7 @@ def build_wip_lookup(so_full: pd.DataFrame, word_files_df: pd.DataFrame) -> pd.D
     )
 
     wip = wip_qty.merge(wip_list, on="Part_Number", how="outer")
-    wip["Part_Number"] = wip["Part_Number"].astype(str).str.strip().map(normalize_item)
+    wip["Part_Number"] = normalize_series(wip["Part_Number"].astype(str).str.strip())
     wip["WIP_Qty"] = pd.to_numeric(wip["WIP_Qty"], errors="coerce").fillna(0)
     wip["WIP"] = wip["WIP"].fillna("")
     return wip
@@ -89,14 +92,14 @@ def transform_sales_order(df_sales_order: pd.DataFrame) -> pd.DataFrame:
     df = df[~df["Item"].str.startswith("total", na=False)]
     df = df[~df["Item"].str.lower().isin(["forwarding charge", "tariff (estimation)"])]
     df = df[df["Inventory Site"] == "WH01S-NTA"]
-    df["Item"] = df["Item"].map(normalize_item)
+    df["Item"] = normalize_series(df["Item"])
     return df
 
 def transform_inventory(inventory_df: pd.DataFrame, wip_lookup: pd.DataFrame | None = None) -> pd.DataFrame:
     inv = inventory_df.copy()
     inv = inv.rename(columns={"Unnamed: 0":"Part_Number"})
     inv["Part_Number"] = inv["Part_Number"].astype(str).str.strip()
-    inv["Part_Number"] = inv["Part_Number"].map(normalize_item)
+    inv["Part_Number"] = normalize_series(inv["Part_Number"])
     # make numeric safely
     for c in ["On Hand","On Sales Order","On PO","Available","On Hand - WIP","WIP_Qty"]:
         if c in inv.columns:
@@ -108,7 +111,7 @@ def transform_inventory(inventory_df: pd.DataFrame, wip_lookup: pd.DataFrame | N
         if "Part_Number" not in wip.columns and "Item" in wip.columns:
             wip["Part_Number"] = wip["Item"]
         if "Part_Number" in wip.columns:
-            wip["Part_Number"] = wip["Part_Number"].astype(str).str.strip().map(normalize_item)
+            wip["Part_Number"] = normalize_series(wip["Part_Number"].astype(str).str.strip())
             keep_cols = [c for c in ["Part_Number", "WIP", "WIP_Qty", "On Hand - WIP"] if c in wip.columns]
             wip = wip.loc[:, keep_cols].drop_duplicates(subset=["Part_Number"])
             inv = inv.merge(wip, on="Part_Number", how="left", suffixes=("", "_src"))
@@ -170,7 +173,7 @@ def transform_pod(df_pod: pd.DataFrame) -> pd.DataFrame:
     if 'Source Name' in pod.columns and 'Deliv Date' in pod.columns:
         mask = pod['Source Name'].astype(str).ne("Neousys Technology Incorp.")
         pod.loc[mask, 'Ship Date'] = pod.loc[mask, 'Deliv Date']
-    pod["Item"] = pod["Item"].map(normalize_item)
+    pod["Item"] = normalize_series(pod["Item"])
     df_pod = pd.DataFrame(pod)
     return df_pod
 
@@ -309,7 +312,7 @@ def build_structured_df(
     final_sales_order = reorder_df_out_by_output(pdf_ref, df_out)
 
     # Map short->long names, drop dup columns if any
-    final_sales_order["Item"] = final_sales_order["Item"].map(normalize_item)
+    final_sales_order["Item"] = normalize_series(final_sales_order["Item"])
     final_sales_order = final_sales_order.loc[:, ~final_sales_order.columns.duplicated()]
 
     # -----------------------------
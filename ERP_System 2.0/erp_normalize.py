@@ -1,51 +1,85 @@
 from __future__ import annotations
 
+import json
+import os
 import re
+from pathlib import Path
 from typing import Any
 
+import numpy as np
 import pandas as pd
 
-# MAP from QB to NAV
-ITEM_MAPPINGS: dict[str, str] = {
-    "AccsyBx-Cardholder-10108GC-5080": "AccsyBx-Cardholder-10108GC-5080_70_70Ti",
-    "AccsyBx-Cardholder-10208GC-5080": "AccsyBx-Cardholder-10208GC-5080_70_70Ti",
-    "AccsyBx-Cardholder-9160GC-2000E": "AccsyBx-Cardholder-9160GC-2000EAda",
-    "Cbl-M12A5F-OT2-B-Red-Fuse-100CM": "Cbl-M12A5F-OT2-Black-Red-Fuse-100CM",
-    "Cblkit-FP-NRU-230V-AWP_NRU-240S": "Cblkit-FP-NRU-230V-AWP_NRU-240S-AWP",
-    "E-mPCIe-BTWifi-WT-6218_Mod_40CM": "Extnd-mPCIeHS-BTWifi-WT-6218_Mod_Cbl-40CM_kits",
-    "E-mPCIe-GPS-M800_Mod_40CM": "Extnd-mPCIeHS_GPS-M800_Mod_Cbl-40CM_kits",
-    "FPnl-3Ant-NRU-170-PPC series": "FPnl-3Ant-NRU-170-PPCseries",
-    "M.242-SSD-128GB-PCIe34-TLC5WT-T": "M.242-SSD-128GB-PCIe34-TLC5WT-TD",
-    "M.242-SSD-256GB-PCIe34-TLC5WT-T": "M.242-SSD-256GB-PCIe34-TLC5WT-TD",
-    "M.280-SSD-256GB-PCIe44-TLC5WT-T": "M.280-SSD-256GB-PCIe44-TLC5WT-TD",
-    "M.280-SSD-4TB-PCIe4-TLCWT5NH-IK": "M.280-SSD-4TB-PCIe4-TLC5WT-NH-IK",
-    "M.280-SSD-512GB-PCIe44-TLC5WT-T": "M.280-SSD-512GB-PCIe44-TLC5WT-TD",
-}
-
-# MAP from NAV to QB
-PATTERN_MAPPINGS = [
-    (
-        re.compile(
-            r"^GC-Jetson-AGX64GB-Orin-Nvidia(?:[- ]?JetPack[-_ ]?[\d\\.]+)?$",
-            re.IGNORECASE,
-        ),
-        "GC-Jetson-AGX64GB-Orin-Nvidia",
-    ),
-    (
-        re.compile(
-            r"^GC-Jetson-AGX32GB-Orin-Nvidia(?:[- ]?JetPack[-_ ]?[\d\\.]+)?$",
-            re.IGNORECASE,
-        ),
-        "GC-Jetson-AGX32GB-Orin-Nvidia",
-    ),
-    (
-        re.compile(
-            r"^GC-Jetson-NX16G-Orin-Nvidia(?:[- ]?JetPack[-_ ]?[\d\\.]+)?$",
-            re.IGNORECASE,
-        ),
-        "GC-Jetson-NX16G-Orin-Nvidia",
-    ),
-]
+# Mappings live in item_mappings.json (override with ERP_ITEM_MAPPINGS):
+#   {"version": N,
+#    "items":    {QB name: NAV name, ...},                       # MAP from QB to NAV
+#    "patterns": [{"pattern", "replacement", "ignore_case"}]}    # MAP from NAV to QB
+MAPPINGS_FILE = Path(os.getenv("ERP_ITEM_MAPPINGS") or Path(__file__).resolve().parent / "item_mappings.json")
+
+MAPPINGS_VERSION: int | None = None
+ITEM_MAPPINGS: dict[str, str] = {}
+PATTERN_MAPPINGS: list[tuple[re.Pattern, str]] = []
+
+# All PATTERN_MAPPINGS as one alternation; group "p<i>" is pattern i, and the
+# first alternative that matches wins, same as testing them in order.
+_COMBINED: re.Pattern | None = None
+
+
+def _compile_combined(patterns: list[tuple[re.Pattern, str]]) -> re.Pattern | None:
+    if not patterns:
+        return None
+    parts = []
+    for i, (pattern, _) in enumerate(patterns):
+        flags = "i" if pattern.flags & re.IGNORECASE else "-i"
+        parts.append(f"(?P<p{i}>(?{flags}:{pattern.pattern}))")
+    return re.compile("|".join(parts))
+
+
+def load_mappings(path: str | Path = MAPPINGS_FILE) -> int | None:
+    """
+    (Re)load ITEM_MAPPINGS / PATTERN_MAPPINGS from a JSON mappings file and
+    return its version. The module-level objects are updated in place, the
+    combined pattern is rebuilt and memoized results are dropped.
+    """
+    global MAPPINGS_VERSION
+    with open(path, encoding="utf-8") as f:
+        data = json.load(f)
+
+    patterns = [
+        (
+            re.compile(entry["pattern"], re.IGNORECASE if entry.get("ignore_case", True) else 0),
+            entry["replacement"],
+        )
+        for entry in data.get("patterns", [])
+    ]
+    ITEM_MAPPINGS.clear()
+    ITEM_MAPPINGS.update(data.get("items", {}))
+    PATTERN_MAPPINGS[:] = patterns
+    MAPPINGS_VERSION = data.get("version")
+    clear_normalize_cache()
+    return MAPPINGS_VERSION
+
+
+# Memo of str(raw value) -> normalized name. The part vocabulary is small
+# (a few thousand names), so results are kept for the life of the process.
+_NORMALIZED: dict[str, str] = {}
+_NORMALIZED_MAX = 200_000
+
+
+def _normalize_name(raw: str) -> str:
+    name = raw.strip()
+    if not name:
+        return name
+
+    direct = ITEM_MAPPINGS.get(name)
+    if direct:
+        return direct
+
+    m = _COMBINED.match(name) if _COMBINED is not None else None
+    if m:
+        replacement = PATTERN_MAPPINGS[int(m.lastgroup[1:])][1]
+        return ITEM_MAPPINGS.get(replacement, replacement)
+
+    return name
 
 
 def normalize_item(value: Any) -> Any:
@@ -54,6 +88,7 @@ def normalize_item(value: Any) -> Any:
     1) Preserve missing values.
     2) Strip whitespace and apply direct ITEM_MAPPINGS.
     3) Apply regex patterns (Jetson JetPack variants) for canonical names.
+    Results are memoized per raw string.
     """
     if value is None:
         return value
@@ -64,24 +99,71 @@ def normalize_item(value: Any) -> Any:
         # Fallback if the object is not pandas-aware
         pass
 
-    name = str(value).strip()
-    if not name:
-        return name
+    raw = str(value)
+    out = _NORMALIZED.get(raw)
+    if out is None:
+        if len(_NORMALIZED) >= _NORMALIZED_MAX:
+            _NORMALIZED.clear()
+        out = _NORMALIZED[raw] = _normalize_name(raw)
+    return out
 
-    direct = ITEM_MAPPINGS.get(name)
-    if direct:
-        return direct
 
-    for pattern, replacement in PATTERN_MAPPINGS:
-        if pattern.match(name):
-            return ITEM_MAPPINGS.get(replacement, replacement)
-
-    return name
+def clear_normalize_cache():
+    """Drop memoized results and recompile patterns (call after editing ITEM_MAPPINGS/PATTERN_MAPPINGS)."""
+    global _COMBINED
+    _NORMALIZED.clear()
+    _COMBINED = _compile_combined(PATTERN_MAPPINGS)
 
 
 def normalize_series(series: pd.Series) -> pd.Series:
-    """Vectorized helper to normalize a pandas Series of item names."""
-    return series.apply(normalize_item)
+    """
+    Vectorized helper to normalize a pandas Series of item names.
+
+    Each distinct value is normalized once (factorize + take), so the cost
+    scales with the number of distinct parts rather than rows; non-string
+    values are told apart by their str(), as normalize_item does. Missing
+    values are returned unchanged. Categorical input stays categorical,
+    with only the categories normalized.
+    """
+    if isinstance(series.dtype, pd.CategoricalDtype):
+        normalized = pd.Index([normalize_item(c) for c in series.cat.categories])
+        cats = normalized.unique()
+        remap = cats.get_indexer(normalized)
+        codes = series.cat.codes.to_numpy()
+        new_codes = np.where(codes >= 0, remap[codes], -1)
+        return pd.Series(
+            pd.Categorical.from_codes(new_codes, categories=cats),
+            index=series.index,
+            name=series.name,
+        )
+
+    original = series.to_numpy(dtype=object)
+    keys = original
+    if pd.api.types.infer_dtype(original, skipna=True) not in ("string", "empty"):
+        # normalize_item only sees str(value); factorizing raw values would merge
+        # 1, 1.0 and True (equal hashes) and give all three the first one's name
+        missing = pd.isna(original)
+        keys = original.copy()
+        keys[~missing] = [str(v) for v in original[~missing]]
+    codes, uniques = pd.factorize(keys, use_na_sentinel=True)
+    if len(uniques) == 0:
+        return pd.Series(original, index=series.index, name=series.name, dtype=object)
 
+    mapped = np.array([normalize_item(u) for u in uniques], dtype=object)
+    out = np.where(codes >= 0, mapped.take(np.maximum(codes, 0)), original)
+    return pd.Series(out, index=series.index, name=series.name, dtype=object)
 
-__all__ = ["normalize_item", "normalize_series", "ITEM_MAPPINGS", "PATTERN_MAPPINGS"]
+
+load_mappings()
+
+
+__all__ = [
+    "normalize_item",
+    "normalize_series",
+    "clear_normalize_cache",
+    "load_mappings",
+    "ITEM_MAPPINGS",
+    "PATTERN_MAPPINGS",
+    "MAPPINGS_FILE",
+    "MAPPINGS_VERSION",
+]
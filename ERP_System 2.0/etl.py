@@ -1,7 +1,15 @@
+import argparse
 import logging
 import pandas as pd
 
+import core
+import erp_normalize
+import ledger as ledger_mod
 from config import (
+    SALES_ORDER_FILE,
+    WAREHOUSE_INV_FILE,
+    SHIPPING_SCHEDULE_FILE,
+    POD_FILE,
     DB_SCHEMA,
     TBL_INVENTORY,
     TBL_STRUCTURED,
@@ -13,8 +21,11 @@ from config import (
     TBL_ITEM_ATP,
 )
 from io_ops import (
-    extract_inputs,
-    write_to_db,
+    read_sales_order_file,
+    read_inventory_file,
+    read_shipping_file,
+    read_pod_file,
+    publish_tables,
     write_final_sales_order_to_gsheet,
     save_not_assigned_so,
     fetch_word_files_df,
@@ -38,22 +49,49 @@ from ledger import (
     _order_events,
 )
 from atp import build_atp_view
+from run_cache import RunManifest, code_digest, frame_digest
+from snapshot import write_snapshot
 
 logging.basicConfig(level=logging.INFO, format="%(asctime)s %(levelname)s %(message)s")
 
 
-def main():
-    # -------- Extract --------
-    so_raw, inv_raw, ship_raw, pod_raw = extract_inputs()
+def main(full_refresh: bool = False):
+    # -------- Extract (fingerprints only; files are read on cache miss) --------
+    manifest = RunManifest(force=full_refresh)
+    code = code_digest(core, ledger_mod, erp_normalize, erp_normalize.MAPPINGS_FILE)
+    so_key   = manifest.fingerprint("sales_order", SALES_ORDER_FILE)
+    inv_key  = manifest.fingerprint("warehouse_inv", WAREHOUSE_INV_FILE)
+    ship_key = manifest.fingerprint("shipping_schedule", SHIPPING_SCHEDULE_FILE)
+    pod_key  = manifest.fingerprint("pod", POD_FILE)
+
     word_files_df = fetch_word_files_df("http://192.168.60.133:5001/api/word-files")
-    pdf_orders_df = fetch_pdf_orders_df_from_supabase()
+    pdf_orders_df = fetch_pdf_orders_df_from_supabase(full_refresh=full_refresh)
 
-    # -------- Transform (raw -> tidy) --------
-    so_full = transform_sales_order(so_raw)                 # sales orders
+    # -------- Transform (raw -> tidy), skipped when inputs are unchanged --------
+    so_full = manifest.stage(                                # sales orders
+        "so_full", {"sales_order": so_key, "code": code},
+        lambda: transform_sales_order(read_sales_order_file()),
+    )
     wip_lookup = build_wip_lookup(so_full, word_files_df)   # WIP from Word picks
-    inv     = transform_inventory(inv_raw, wip_lookup)      # warehouse snapshot (today)
-    pod     = transform_pod(pod_raw)
-    ship    = transform_shipping(ship_raw)
+    inv = manifest.stage(                                    # warehouse snapshot (today)
+        "inv", {"warehouse_inv": inv_key, "wip": frame_digest(wip_lookup), "code": code},
+        lambda: transform_inventory(read_inventory_file(), wip_lookup),
+    )
+    pod = manifest.stage(
+        "pod", {"pod": pod_key, "code": code},
+        lambda: transform_pod(read_pod_file()),
+    )
+    ship = manifest.stage(
+        "ship", {"shipping_schedule": ship_key, "code": code},
+        lambda: transform_shipping(read_shipping_file()),
+    )
+
+    # -------- NAV preinstall expansion (for IN events) --------
+    nav_exp = manifest.stage(
+        "nav_exp", {"shipping_schedule": ship_key, "code": code},
+        lambda: expand_nav_preinstalled(ship),
+    )
+    manifest.save()
 
     # -------- Structured (ERP view base) --------
     structured, final_sales_order = build_structured_df(
@@ -63,9 +101,6 @@ def main():
     # Vectorized “On Hand - WIP”
     inv = add_onhand_minus_wip(inv, structured)
 
-    # -------- NAV preinstall expansion (for IN events) --------
-    nav_exp = expand_nav_preinstalled(ship)
-
     # -------- Build events: IN/OUT only (no reconcile) --------
     events_inout = build_events(structured, nav_exp, pod)
     events_all = _order_events(events_inout)   # no concat, no recon
@@ -91,15 +126,24 @@ def main():
     )
     print(summary)
 
-    # -------- Load to DB --------
-    write_to_db(inv,        schema=DB_SCHEMA, table=TBL_INVENTORY)
-    write_to_db(so_full,    schema=DB_SCHEMA, table=TBL_SALES_ORDER)
-    write_to_db(structured, schema=DB_SCHEMA, table=TBL_STRUCTURED)
-    write_to_db(pod,        schema=DB_SCHEMA, table=TBL_POD)
-    write_to_db(ship,       schema=DB_SCHEMA, table=TBL_Shipping)
-    write_to_db(ledger,     schema=DB_SCHEMA, table=TBL_LEDGER)
-    write_to_db(item_summary, schema=DB_SCHEMA, table=TBL_ITEM_SUMMARY)
-    write_to_db(atp_view,   schema=DB_SCHEMA, table=TBL_ITEM_ATP)
+    # -------- Load to DB (all tables swapped in together) --------
+    tables = {
+        TBL_INVENTORY:    inv,
+        TBL_SALES_ORDER:  so_full,
+        TBL_STRUCTURED:   structured,
+        TBL_POD:          pod,
+        TBL_Shipping:     ship,
+        TBL_LEDGER:       ledger,
+        TBL_ITEM_SUMMARY: item_summary,
+        TBL_ITEM_ATP:     atp_view,
+    }
+    publish_tables(tables, schema=DB_SCHEMA)
+
+    # -------- Local snapshot for the web server (after the DB commit) --------
+    try:
+        write_snapshot(tables)
+    except Exception:
+        logging.exception("snapshot write failed; server will read from the DB")
 
     print(
         f"✅ Loaded: {DB_SCHEMA}.{TBL_SALES_ORDER}={len(so_full)}; "
@@ -119,8 +163,12 @@ def main():
 
 
 if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Run the ERP ETL pipeline.")
+    parser.add_argument("--full", action="store_true",
+                        help="ignore the run manifest and re-transform every input")
+    args = parser.parse_args()
     logging.info("Running ETL pipeline...")
-    main()
+    main(full_refresh=args.full)
     logging.info("Done.")
 
 
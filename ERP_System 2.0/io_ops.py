@@ -1,25 +1,66 @@
 from __future__ import annotations
-import os, json, requests, pandas as pd, numpy as np
+import os, requests, pandas as pd, numpy as np
+from concurrent.futures import ThreadPoolExecutor
+from functools import lru_cache
 import gspread
 from gspread_dataframe import set_with_dataframe
 from oauth2client.service_account import ServiceAccountCredentials
 
+import psycopg
+from psycopg import sql as pgsql
+from sqlalchemy import text
+
 from core import normalize_wo_number
 from db_config import get_engine
+from pdf_orders import load_pdf_orders
+from run_cache import cached_parse
 
 from config import SALES_ORDER_FILE, WAREHOUSE_INV_FILE, SHIPPING_SCHEDULE_FILE, POD_FILE
 
 # ---------- DB engine ----------
+@lru_cache(maxsize=1)
 def engine():
+    # One engine (and connection pool) per process, shared by all loads
     return get_engine()
 
 # ---------- Extract ----------
+# Text identifier columns are read as str so the C parser never guesses
+# numeric types for PO / SO numbers (keys not present in a file are ignored).
+SALES_ORDER_DTYPES = {"Unnamed: 0": str, "Type": str, "Num": str, "P. O. #": str, "Name": str,
+                      "Item": str, "Inventory Site": str, "Memo": str}
+POD_DTYPES = {"Type": str, "Num": str, "Name": str, "Source Name": str, "Memo": str, "Item": str}
+
+def _read_csv_c(path, **kwargs) -> pd.DataFrame:
+    # Force str paths for Windows/OneDrive oddities; fall back to the python
+    # engine only if the C parser trips on a malformed export.
+    try:
+        return pd.read_csv(str(path), engine="c", **kwargs)
+    except pd.errors.ParserError:
+        return pd.read_csv(str(path), engine="python", **kwargs)
+
+def read_sales_order_file() -> pd.DataFrame:
+    return cached_parse(SALES_ORDER_FILE, lambda: _read_csv_c(
+        SALES_ORDER_FILE, encoding="ISO-8859-1", dtype=SALES_ORDER_DTYPES))
+
+def read_inventory_file() -> pd.DataFrame:
+    return cached_parse(WAREHOUSE_INV_FILE, lambda: _read_csv_c(WAREHOUSE_INV_FILE))
+
+def read_shipping_file() -> pd.DataFrame:
+    return cached_parse(SHIPPING_SCHEDULE_FILE, lambda: pd.read_excel(str(SHIPPING_SCHEDULE_FILE)))
+
+def read_pod_file() -> pd.DataFrame:
+    return cached_parse(POD_FILE, lambda: _read_csv_c(
+        POD_FILE, encoding="ISO-8859-1", dtype=POD_DTYPES))
+
+def read_excel_cached(path) -> pd.DataFrame:
+    """pd.read_excel through the parsed-input cache (handy in notebooks)."""
+    return cached_parse(path, lambda: pd.read_excel(str(path)))
+
 def extract_inputs():
-    # Force str paths for Windows/OneDrive oddities; explicit engine to avoid parser quirks
-    df_sales_order       = pd.read_csv(str(SALES_ORDER_FILE), encoding="ISO-8859-1", engine="python")
-    inventory_df         = pd.read_csv(str(WAREHOUSE_INV_FILE))
-    df_shipping_schedule = pd.read_excel(str(SHIPPING_SCHEDULE_FILE))
-    df_pod               = pd.read_csv(str(POD_FILE), encoding="ISO-8859-1", engine="python")
+    df_sales_order       = read_sales_order_file()
+    inventory_df         = read_inventory_file()
+    df_shipping_schedule = read_shipping_file()
+    df_pod               = read_pod_file()
     return df_sales_order, inventory_df, df_shipping_schedule, df_pod
 
 def fetch_word_files_df(api_url: str) -> pd.DataFrame:
@@ -35,36 +76,90 @@ def fetch_word_files_df(api_url: str) -> pd.DataFrame:
     wf["WO_Number"] = wf["WO_Number"].astype(str).apply(normalize_wo_number)
     return wf
 
-def fetch_pdf_orders_df_from_supabase() -> pd.DataFrame:
-    """Return two columns ['WO','Product Number'] built from pdf_file_log.extracted_data JSON."""
-    eng = get_engine()
-    rows = pd.read_sql('SELECT order_id, extracted_data FROM public.pdf_file_log', eng)
-
-    def rows_from_json(extracted_data, order_id=""):
-        if isinstance(extracted_data, str):
-            try:
-                extracted_data = json.loads(extracted_data)
-            except Exception:
-                extracted_data = {}
-        data = extracted_data or {}
-        wo = data.get("wo", order_id)
-        items = data.get("items") or []
-        if not items:
-            return [{"WO": wo, "Product Number": ""}]
-        out = []
-        for it in items:
-            pn = it.get("product_number") or it.get("part_number") or it.get("product") or it.get("part") or ""
-            out.append({"WO": wo, "Product Number": pn})
-        return out
-
-    all_rows = []
-    for _, r in rows.iterrows():
-        all_rows.extend(rows_from_json(r.get("extracted_data"), r.get("order_id")))
-    return pd.DataFrame(all_rows, columns=["WO", "Product Number"])
+def fetch_pdf_orders_df_from_supabase(full_refresh: bool = False) -> pd.DataFrame:
+    """
+    Return two columns ['WO','Product Number'] built from pdf_file_log.extracted_data JSON.
+    Flattened in Postgres; only rows added since the last run are fetched.
+    """
+    return load_pdf_orders(engine(), full_refresh=full_refresh)
 
 # ---------- Load (DB) ----------
+def _qname(schema: str, table: str) -> str:
+    return f'"{schema}"."{table}"'
+
+def _copy_into_staging(conn, df: pd.DataFrame, schema: str, table: str) -> str:
+    """
+    (Re)create "<table>__staging" with the column types to_sql would pick
+    for `df`, then stream the rows in with COPY FROM STDIN.
+    Returns the staging table name. Runs on `conn`'s current transaction.
+    """
+    staging = f"{table}__staging"
+    conn.execute(text(f"DROP TABLE IF EXISTS {_qname(schema, staging)}"))
+    conn.execute(text(pd.io.sql.get_schema(df, staging, con=conn, schema=schema)))
+
+    raw = conn.connection.driver_connection
+    if not isinstance(raw, psycopg.Connection):
+        # Not psycopg 3 (e.g. a plain postgresql:// DSN on psycopg2): batched INSERTs
+        df.to_sql(staging, conn, schema=schema, if_exists="append", index=False,
+                  method="multi", chunksize=10_000)
+        return staging
+
+    cols = pgsql.SQL(", ").join(pgsql.Identifier(str(c)) for c in df.columns)
+    stmt = pgsql.SQL("COPY {}.{} ({}) FROM STDIN").format(
+        pgsql.Identifier(schema), pgsql.Identifier(staging), cols
+    )
+    # Box to Python scalars and turn NaN/NaT/<NA> into NULL
+    values = df.astype(object).where(df.notna(), None)
+    with raw.cursor() as cur, cur.copy(stmt) as copy:
+        for row in values.itertuples(index=False, name=None):
+            copy.write_row(row)
+    return staging
+
+def _swap_in(conn, schema: str, table: str, staging: str):
+    """Replace `table` with its loaded staging table (call inside a transaction)."""
+    conn.execute(text(f"DROP TABLE IF EXISTS {_qname(schema, table)}"))
+    conn.execute(text(f'ALTER TABLE {_qname(schema, staging)} RENAME TO "{table}"'))
+
 def write_to_db(df: pd.DataFrame, schema: str, table: str):
-    df.to_sql(table, engine(), schema=schema, if_exists="replace", index=False, method="multi", chunksize=10_000)
+    """
+    Replace schema.table with `df`: COPY into a staging table, then drop the
+    old table and rename the staging one in the same transaction, so readers
+    see either the previous table or the complete new one.
+    """
+    with engine().begin() as conn:
+        staging = _copy_into_staging(conn, df, schema, table)
+        _swap_in(conn, schema, table, staging)
+
+def publish_tables(frames: dict[str, pd.DataFrame], schema: str, *, max_workers: int = 4):
+    """
+    Publish several tables as one unit.
+
+    Every frame is COPYed into its own staging table concurrently over the
+    shared pool. Then a single transaction swaps all of them in, so readers
+    never mix tables from two ETL runs. Tables are swapped in sorted name
+    order; readers that take locks in the same order cannot deadlock with
+    the swap. If any load fails, nothing is swapped and the staging tables
+    are dropped.
+    """
+    eng = engine()
+
+    def _stage(item):
+        table, df = item
+        with eng.begin() as conn:
+            return table, _copy_into_staging(conn, df, schema, table)
+
+    try:
+        with ThreadPoolExecutor(max_workers=max(1, min(max_workers, len(frames)))) as pool:
+            staged = dict(pool.map(_stage, frames.items()))
+    except Exception:
+        with eng.begin() as conn:
+            for table in frames:
+                conn.execute(text(f"DROP TABLE IF EXISTS {_qname(schema, f'{table}__staging')}"))
+        raise
+
+    with eng.begin() as conn:
+        for table in sorted(staged):
+            _swap_in(conn, schema, table, staged[table])
 
 # ---------- Google Sheets ----------
 def write_final_sales_order_to_gsheet(df: pd.DataFrame, *,
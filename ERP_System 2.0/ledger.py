@@ -4,7 +4,8 @@ import numpy as np
 import pandas as pd
 from pandas.api.types import CategoricalDtype
 from core import _norm_cols, _norm_key
-from erp_normalize import normalize_item
+from erp_normalize import normalize_item, normalize_series
+from run_cache import CACHE_DIR, KeyedCache
 
 ## 1) NAV (shipping) → expand pre-installed components
 INCL_SPLIT = re.compile(r"\bincluding\b", re.IGNORECASE)
@@ -32,6 +33,39 @@ def parse_component_token(token: str) -> tuple[str, float]:
         return item, qty
     return clean_space(token), 1.0
 
+# Parsed descriptions persist across ETL runs in CACHE_DIR, keyed by a hash of
+# the cleaned description. Bump the leading number when the parse rules change.
+_PARSE_RULES = f"1|{INCL_SPLIT.pattern}|{QTYX_RE.pattern}"
+_DESC_CACHE: KeyedCache | None = None
+
+def _desc_cache() -> KeyedCache:
+    global _DESC_CACHE
+    if _DESC_CACHE is None:
+        _DESC_CACHE = KeyedCache(CACHE_DIR / "description_parse.json", version=KeyedCache.key(_PARSE_RULES))
+    return _DESC_CACHE
+
+def _parse_description_entry(cache: KeyedCache, desc: str) -> list:
+    key = cache.key(desc)
+    entry = cache.get(key)
+    if entry is None:
+        parent, tokens = parse_description(desc)
+        entry = [parent, [list(parse_component_token(tok)) for tok in tokens]]
+        cache.put(key, entry)
+    return entry
+
+def parse_description_cached(desc: str) -> tuple[str, list[tuple[str, float]]]:
+    """
+    (parent, [(component, qty_per_parent), ...]) for a NAV description,
+    i.e. parse_description + parse_component_token, memoized on disk.
+    For notebooks and ad-hoc callers; the web server does no BOM expansion.
+    Call save_description_cache() to persist new entries.
+    """
+    parent, comps = _parse_description_entry(_desc_cache(), clean_space(desc))
+    return parent, [(item, qty) for item, qty in comps]
+
+def save_description_cache():
+    _desc_cache().save()
+
 def expand_preinstalled_row(row: pd.Series) -> pd.DataFrame:
     parent, tokens = parse_description(row.get("Description", ""))
     base_qty = float(row.get("Qty(+)", 0) or 0)
@@ -58,7 +92,20 @@ def expand_preinstalled_row(row: pd.Series) -> pd.DataFrame:
         return pd.concat([pd.DataFrame(comp_rows), pd.DataFrame([parent_row])], ignore_index=True)
     return pd.DataFrame([parent_row])
 
+def _clean_space_series(s: pd.Series) -> pd.Series:
+    """Vectorized clean_space for a column already cast to str."""
+    return s.str.replace("\u00A0", " ", regex=False).str.replace("\u3000", " ", regex=False).str.strip()
+
 def expand_nav_preinstalled(NAV: pd.DataFrame) -> pd.DataFrame:
+    """
+    Expand "Pre" NAV rows into one row per pre-installed component plus the
+    parent row (same output as applying expand_preinstalled_row per row).
+
+    Each distinct Description is parsed once via the on-disk parse cache
+    (see parse_description_cached) and fanned out to its rows by factorize
+    code, so cost follows new descriptions rather than rows. Rows stay
+    grouped as components-then-parent, in NAV order, before the non-Pre rows.
+    """
     NAV = NAV.copy()
     for col in ["Pre/Bare", "Qty(+)", "Item"]:
         if col not in NAV.columns:
@@ -66,14 +113,58 @@ def expand_nav_preinstalled(NAV: pd.DataFrame) -> pd.DataFrame:
     if "Description" not in NAV.columns:
         NAV["Description"] = ""
 
-    NAV["Description"] = NAV["Description"].astype(str).apply(clean_space)
+    NAV["Description"] = _clean_space_series(NAV["Description"].astype(str))
 
     pre_mask = NAV["Pre/Bare"].astype(str).str.strip().str.casefold().eq("pre")
-    nav_pre   = NAV.loc[pre_mask].copy()
+    nav_pre   = NAV.loc[pre_mask].reset_index(drop=True)
     nav_other = NAV.loc[~pre_mask].copy()
 
-    expanded_parts = [expand_preinstalled_row(r) for _, r in nav_pre.iterrows()]
-    expanded_pre = (pd.concat(expanded_parts, ignore_index=True) if expanded_parts else nav_pre.copy())
+    # Parse each distinct description once (cached across runs), then fan out by code
+    cache = _desc_cache()
+    codes, uniques = pd.factorize(nav_pre["Description"])
+    parsed = [_parse_description_entry(cache, d) for d in uniques]
+    cache.save()
+
+    u_parent = np.array([p for p, _ in parsed], dtype=object)
+    u_ncomp = np.array([len(c) for _, c in parsed], dtype=np.int64)
+    u_start = np.cumsum(u_ncomp) - u_ncomp
+    flat = [c for _, comps in parsed for c in comps]
+    u_item = np.array([c[0] for c in flat], dtype=object)
+    u_qty = np.array([c[1] for c in flat], dtype=float)
+
+    # Parent = first comma-separated token before "including", else the row's Item
+    parent = pd.Series(u_parent[codes], index=nav_pre.index, dtype=object)
+    item_fallback = _clean_space_series(nav_pre["Item"].astype(str))
+    parent_item = parent.where(parent.ne(""), item_fallback)
+
+    # Row i gets components u_start[c]..u_start[c]+u_ncomp[c] of its description c
+    row_ncomp = u_ncomp[codes]
+    pos = np.repeat(np.arange(len(nav_pre)), row_ncomp)
+    within = np.arange(len(pos)) - np.repeat(np.cumsum(row_ncomp) - row_ncomp, row_ncomp)
+    comp_idx = np.repeat(u_start[codes], row_ncomp) + within
+    comp_item = u_item[comp_idx]
+    comp_qty = u_qty[comp_idx]
+
+    base_qty = pd.to_numeric(nav_pre["Qty(+)"], errors="coerce").to_numpy(dtype=float)
+
+    comps = nav_pre.take(pos).reset_index(drop=True)
+    comps["Parent_Item"]    = parent_item.to_numpy()[pos]
+    comps["Item"]           = comp_item
+    comps["Qty_per_parent"] = comp_qty
+    comps["Qty(+)"]         = base_qty[pos] * comp_qty
+    comps["IsParent"]       = False
+
+    parents = nav_pre.copy()
+    parents["Parent_Item"]    = parent_item
+    parents["Item"]           = parent_item
+    parents["Qty_per_parent"] = 1.0
+    parents["IsParent"]       = True
+
+    # Stable sort on (source row, component-before-parent) restores the per-row grouping
+    order = np.concatenate([pos, np.arange(len(nav_pre))])
+    is_parent = np.concatenate([np.zeros(len(pos), dtype=np.int8), np.ones(len(nav_pre), dtype=np.int8)])
+    expanded_pre = pd.concat([comps, parents], ignore_index=True)
+    expanded_pre = expanded_pre.take(np.lexsort((is_parent, order))).reset_index(drop=True)
 
     needed_cols = list(NAV.columns) + ["Parent_Item", "Qty_per_parent", "IsParent"]
     expanded_pre = expanded_pre.reindex(columns=needed_cols, fill_value=pd.NA)
@@ -89,7 +180,7 @@ def expand_nav_preinstalled(NAV: pd.DataFrame) -> pd.DataFrame:
     expanded_all["Qty_per_parent"] = pd.to_numeric(expanded_all["Qty_per_parent"], errors="coerce").fillna(1.0)
     expanded_all["IsParent"]       = expanded_all["IsParent"].astype(bool)
     expanded_all["Date"] = pd.to_datetime(expanded_all["Ship Date"], errors="coerce") + pd.Timedelta(days=5)
-    expanded_all["Item"] = expanded_all["Item"].astype(str).map(normalize_item)
+    expanded_all["Item"] = normalize_series(expanded_all["Item"].astype(str))
     return expanded_all
 
 
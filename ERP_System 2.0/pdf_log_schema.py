@@ -0,0 +1,152 @@
+"""
+Schema migrations for public.pdf_file_log (filename search).
+
+    python pdf_log_schema.py [--table public.pdf_file_log]
+
+Adds, idempotently:
+  - the pg_trgm extension and a GIN trigram index on file_name, so
+    `file_name ILIKE '%...%'` no longer scans the whole table
+  - so_key: a stored generated column holding the "SO-2025xxxx" number found
+    in file_name (same rule as core.normalize_wo_number, NULL when there is
+    none), with a btree index on (so_key, id DESC) for "newest PDF of an SO"
+
+Indexes are built CONCURRENTLY so the PDF extractor can keep inserting.
+Adding so_key rewrites the table once (brief exclusive lock).
+Readers check `has_so_key` and fall back to ILIKE while it is missing.
+"""
+from __future__ import annotations
+
+import argparse
+import logging
+import re
+
+from sqlalchemy import text
+
+from core import WO_NUMBER_RE
+
+log = logging.getLogger(__name__)
+
+PDF_LOG_TABLE = "public.pdf_file_log"
+
+# core.WO_NUMBER_RE in Postgres ARE syntax (\y is the word boundary)
+SO_KEY_SQL = r"'SO-' || substring(file_name from '\y(20\d{6})\y')"
+
+# Whole-query SO numbers ("SO-20250975", "so 20250975", "20250975") are looked up by so_key
+_SO_QUERY_RE = re.compile(r"(?:SO[-\s]?)?(20\d{6})", re.IGNORECASE)
+
+MIGRATIONS: list[tuple[str, list[str]]] = [
+    ("pg_trgm", [
+        "CREATE EXTENSION IF NOT EXISTS pg_trgm",
+    ]),
+    ("file_name trigram index", [
+        "CREATE INDEX CONCURRENTLY IF NOT EXISTS pdf_file_log_file_name_trgm_idx "
+        "ON {table} USING gin (file_name gin_trgm_ops)",
+    ]),
+    ("so_key column", [
+        "ALTER TABLE {table} ADD COLUMN IF NOT EXISTS so_key text "
+        f"GENERATED ALWAYS AS ({SO_KEY_SQL}) STORED",
+        "CREATE INDEX CONCURRENTLY IF NOT EXISTS pdf_file_log_so_key_idx ON {table} (so_key, id DESC)",
+    ]),
+]
+
+
+_INDEX_NAMES = ("pdf_file_log_file_name_trgm_idx", "pdf_file_log_so_key_idx")
+
+# Newest row per search key, for many keys in one query: rows whose so_key is
+# the key's SO number (:so_keys, NULL for other keys) or whose file_name
+# contains the key. so_key only holds a name's first SO number, so ILIKE hits
+# always count too, as in a single-key search. {table} as in MIGRATIONS.
+NEWEST_FOR_KEYS_SQL = (
+    "SELECT k.key, m.id "
+    "FROM unnest(CAST(:keys AS text[]), CAST(:so_keys AS text[])) AS k(key, so_key) "
+    "CROSS JOIN LATERAL ("
+    "    SELECT id FROM {table} "
+    "    WHERE so_key = k.so_key OR file_name ILIKE '%' || k.key || '%' "
+    "    ORDER BY id DESC LIMIT 1"
+    ") AS m"
+)
+
+
+def so_key_for(file_name) -> str | None:
+    """Python twin of the so_key column."""
+    m = WO_NUMBER_RE.search(str(file_name or ""))
+    return f"SO-{m.group(1)}" if m else None
+
+
+def so_key_for_query(query: str) -> str | None:
+    """so_key to look up when the whole search term is an SO number, else None."""
+    m = _SO_QUERY_RE.fullmatch((query or "").strip())
+    return f"SO-{m.group(1)}" if m else None
+
+
+def has_so_key(con, table: str = PDF_LOG_TABLE) -> bool:
+    row = con.execute(
+        text(
+            "SELECT 1 FROM pg_attribute "
+            "WHERE attrelid = to_regclass(:t) AND attname = 'so_key' AND NOT attisdropped"
+        ),
+        {"t": table},
+    ).first()
+    return row is not None
+
+
+def _drop_invalid_indexes(con, table: str):
+    # A failed CONCURRENTLY build leaves an INVALID index that IF NOT EXISTS would keep
+    rows = con.execute(
+        text(
+            "SELECT i.indexrelid::regclass::text FROM pg_index i "
+            "JOIN pg_class c ON c.oid = i.indexrelid "
+            "WHERE i.indrelid = to_regclass(:t) AND NOT i.indisvalid AND c.relname = ANY(:names)"
+        ),
+        {"t": table, "names": list(_INDEX_NAMES)},
+    ).scalars().all()
+    for name in rows:
+        log.warning("dropping invalid index %s", name)
+        con.execute(text(f"DROP INDEX CONCURRENTLY IF EXISTS {name}"))
+
+
+def apply_migrations(engine, table: str = PDF_LOG_TABLE) -> list[str]:
+    """
+    Apply every step (each is idempotent) and return the names of those that
+    succeeded. A failing step (e.g. pg_trgm not installed on the server) is
+    logged and skipped; the others still run.
+    """
+    done = []
+    with engine.connect().execution_options(isolation_level="AUTOCOMMIT") as con:
+        _drop_invalid_indexes(con, table)
+        for name, statements in MIGRATIONS:
+            try:
+                for stmt in statements:
+                    con.execute(text(stmt.replace("{table}", table)))
+            except Exception as exc:
+                log.warning("%s: %s skipped (%s)", table, name, getattr(exc, "orig", exc))
+                continue
+            log.info("%s: %s", table, name)
+            done.append(name)
+    return done
+
+
+__all__ = [
+    "MIGRATIONS",
+    "NEWEST_FOR_KEYS_SQL",
+    "PDF_LOG_TABLE",
+    "apply_migrations",
+    "has_so_key",
+    "so_key_for",
+    "so_key_for_query",
+]
+
+
+def main():
+    from db_config import get_engine
+
+    ap = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    ap.add_argument("--table", default=PDF_LOG_TABLE)
+    args = ap.parse_args()
+    logging.basicConfig(level=logging.INFO, format="%(message)s")
+    apply_migrations(get_engine(), args.table)
+
+
+if __name__ == "__main__":
+    main()
+
@@ -0,0 +1,181 @@
+"""
+(WO, Product Number) pairs from public.pdf_file_log.extracted_data.
+
+Shared by the ETL (io_ops) and the web server. The items list is expanded in
+Postgres with jsonb_array_elements, so only the two text columns travel over
+the wire, and fetches are incremental: rows with id <= the last seen id are
+served from a local copy under CACHE_DIR. A digest per block of ids catches
+rows that were re-extracted or deleted since; only those blocks are fetched
+again.
+"""
+from __future__ import annotations
+
+import json
+import logging
+import os
+from pathlib import Path
+
+import pandas as pd
+from sqlalchemy import text
+
+from run_cache import CACHE_DIR
+
+log = logging.getLogger(__name__)
+
+PDF_ORDER_COLUMNS = ["WO", "Product Number"]
+PDF_ORDERS_CACHE = CACHE_DIR / "pdf_orders.pkl"
+
+# One output row per items[] element (one row with "" when there are none).
+# WO is extracted_data->>'wo' when the key exists, else order_id; the product
+# number is the first non-empty of product_number / part_number / product / part.
+PDF_ORDERS_SQL = text("""
+    SELECT l.id,
+           CASE WHEN d.doc ? 'wo' THEN d.doc ->> 'wo' ELSE l.order_id::text END AS "WO",
+           COALESCE(NULLIF(it.elem ->> 'product_number', ''),
+                    NULLIF(it.elem ->> 'part_number', ''),
+                    NULLIF(it.elem ->> 'product', ''),
+                    NULLIF(it.elem ->> 'part', ''),
+                    '') AS "Product Number"
+    FROM public.pdf_file_log AS l
+    CROSS JOIN LATERAL (SELECT COALESCE(l.extracted_data::jsonb, '{}'::jsonb) AS doc) AS d
+    LEFT JOIN LATERAL jsonb_array_elements(
+        CASE WHEN jsonb_typeof(d.doc -> 'items') = 'array' THEN d.doc -> 'items' ELSE '[]'::jsonb END
+    ) WITH ORDINALITY AS it(elem, ord) ON TRUE
+    WHERE l.id > :after_id AND l.id <= :upto
+    ORDER BY l.id, it.ord
+""")
+
+PDF_ORDERS_RAW_SQL = text(
+    "SELECT id, order_id, extracted_data FROM public.pdf_file_log "
+    "WHERE id > :after_id AND id <= :upto ORDER BY id"
+)
+
+PDF_MAX_ID_SQL = text("SELECT max(id) FROM public.pdf_file_log")
+
+# Ids per digest block; a changed block is fetched again as a whole
+DIGEST_BLOCK = 1024
+
+# Per block of ids: md5 over (id, order_id, md5(extracted_data)) of its rows
+PDF_DIGESTS_SQL = text("""
+    SELECT id / :block AS block,
+           md5(string_agg(id::text || ':' || coalesce(order_id::text, '') || ':'
+                          || md5(coalesce(extracted_data::text, '')), ',' ORDER BY id)) AS digest
+    FROM public.pdf_file_log
+    WHERE id <= :upto
+    GROUP BY 1
+""")
+
+_NO_UPPER_BOUND = 2**63 - 1
+
+
+def _rows_from_json(extracted_data, order_id=""):
+    if isinstance(extracted_data, str):
+        try:
+            extracted_data = json.loads(extracted_data)
+        except Exception:
+            extracted_data = {}
+    data = extracted_data or {}
+    wo = data.get("wo", order_id)
+    items = data.get("items") or []
+    if not items:
+        return [{"WO": wo, "Product Number": ""}]
+    out = []
+    for it in items:
+        pn = it.get("product_number") or it.get("part_number") or it.get("product") or it.get("part") or ""
+        out.append({"WO": wo, "Product Number": pn})
+    return out
+
+
+def _flatten_in_python(con, after_id: int, upto: int) -> pd.DataFrame:
+    # Fallback for databases without jsonb (or text columns holding invalid JSON)
+    rows = pd.read_sql(PDF_ORDERS_RAW_SQL, con, params={"after_id": after_id, "upto": upto})
+    out = []
+    for rid, order_id, data in zip(rows["id"], rows["order_id"], rows["extracted_data"]):
+        out.extend({"id": rid, **r} for r in _rows_from_json(data, order_id))
+    return pd.DataFrame(out, columns=["id", *PDF_ORDER_COLUMNS])
+
+
+def fetch_pdf_orders_since(con, after_id: int = 0, upto: int | None = None) -> pd.DataFrame:
+    """['id','WO','Product Number'] for pdf_file_log rows with after_id < id <= upto, flattened in SQL."""
+    upto = _NO_UPPER_BOUND if upto is None else upto
+    try:
+        return pd.read_sql(PDF_ORDERS_SQL, con, params={"after_id": after_id, "upto": upto})
+    except Exception as exc:
+        log.warning("jsonb flattening failed (%s); flattening pdf_file_log in Python", exc)
+        if hasattr(con, "rollback"):
+            con.rollback()
+        return _flatten_in_python(con, after_id, upto)
+
+
+def _block_digests(con, upto: int) -> dict[int, str] | None:
+    """{block: digest} for rows with id <= upto; None where md5/string_agg are unavailable."""
+    try:
+        return {int(b): d for b, d in con.execute(PDF_DIGESTS_SQL, {"block": DIGEST_BLOCK, "upto": upto})}
+    except Exception as exc:
+        log.info("pdf_file_log digests unavailable (%s); fetching everything", exc)
+        if hasattr(con, "rollback"):
+            con.rollback()
+        return None
+
+
+def load_pdf_orders(engine, *, cache_file: str | Path | None = PDF_ORDERS_CACHE, full_refresh: bool = False) -> pd.DataFrame:
+    """
+    Return ['WO','Product Number'] for every pdf_file_log row.
+
+    The previous result (with ids and per-block digests) is kept in
+    `cache_file`. Rows with a larger id are fetched, and so are the blocks of
+    ids whose digest changed (rows re-extracted or deleted). `full_refresh`
+    (etl.py --full) ignores the cache.
+    """
+    cache_file = Path(cache_file) if cache_file else None
+    cached = None
+    if cache_file is not None and cache_file.exists() and not full_refresh:
+        try:
+            cached = pd.read_pickle(cache_file)
+        except Exception as exc:
+            log.warning("pdf orders cache unreadable (%s); fetching everything", exc)
+        # Caches from before block digests were a bare DataFrame
+        if not isinstance(cached, dict) or cached.get("digests") is None:
+            cached = None
+
+    with engine.connect() as con:
+        max_id = con.execute(PDF_MAX_ID_SQL).scalar() or 0
+        after_id, stale = 0, []
+        rows = None
+        if cached is not None:
+            after_id = min(cached["max_id"], max_id)
+            now = _block_digests(con, after_id)
+            if now is not None:
+                rows = cached["rows"]
+                before = cached["digests"]
+                stale = sorted(b for b in set(before) | set(now) if before.get(b) != now.get(b))
+        # Taken before fetching: a row edited after this is caught by the next load
+        digests = _block_digests(con, max_id) if rows is None or max_id != after_id or stale else cached["digests"]
+        if rows is None:
+            after_id = 0
+        new = [fetch_pdf_orders_since(con, after_id, max_id)]
+        for b in stale:
+            lo, hi = b * DIGEST_BLOCK - 1, min((b + 1) * DIGEST_BLOCK - 1, after_id)
+            new.append(fetch_pdf_orders_since(con, lo, hi))
+
+    if stale:
+        ids = rows["id"].to_numpy()
+        rows = rows.loc[~pd.Series(ids // DIGEST_BLOCK).isin(stale).to_numpy()]
+        log.info("pdf_file_log: %d block(s) changed since the last fetch", len(stale))
+    fetched = sum(len(f) for f in new)
+    parts = ([rows] if rows is not None and not rows.empty else []) + [f for f in new if not f.empty]
+    df = pd.concat(parts, ignore_index=True) if parts else new[0]
+    if stale:
+        df = df.sort_values("id", kind="stable", ignore_index=True)
+    log.info("pdf orders: %d rows fetched after id %d (%d total)", fetched, after_id, len(df))
+
+    if cache_file is not None and digests is not None and (fetched or cached is None or stale):
+        cache_file.parent.mkdir(parents=True, exist_ok=True)
+        tmp = cache_file.with_suffix(f".{os.getpid()}.tmp")
+        pd.to_pickle({"rows": df, "digests": digests, "max_id": int(max_id)}, tmp)
+        os.replace(tmp, cache_file)
+
+    return df[PDF_ORDER_COLUMNS].reset_index(drop=True)
+
+
+__all__ = ["PDF_ORDER_COLUMNS", "fetch_pdf_orders_since", "load_pdf_orders"]
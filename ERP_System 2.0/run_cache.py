@@ -0,0 +1,232 @@
+from __future__ import annotations
+
+import hashlib
+import json
+import logging
+import os
+from datetime import datetime
+from pathlib import Path
+from typing import Callable
+
+import numpy as np
+import pandas as pd
+
+try:
+    # Optional: Parquet needs pyarrow; without it the input cache uses pickle.
+    import pyarrow  # type: ignore  # noqa: F401
+    HAVE_PYARROW = True
+except ImportError:
+    HAVE_PYARROW = False
+
+# Local cache for ETL manifests and intermediate frames.
+# Override with ERP_CACHE_DIR (e.g. to keep it off the OneDrive share).
+CACHE_DIR = Path(os.getenv("ERP_CACHE_DIR") or Path(__file__).resolve().parent / ".cache")
+
+log = logging.getLogger(__name__)
+
+
+def _sha256_file(path: Path, chunk: int = 1 << 20) -> str:
+    h = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(chunk), b""):
+            h.update(block)
+    return h.hexdigest()
+
+
+def file_fingerprint(path: str | Path, previous: dict | None = None) -> dict:
+    """
+    Return {'path','size','mtime','sha256'} for a file.
+    The content hash is reused from `previous` when path, size and mtime
+    are unchanged, so an untouched input is never re-read.
+    """
+    path = Path(path)
+    st = path.stat()
+    fp = {"path": str(path), "size": st.st_size, "mtime": st.st_mtime_ns}
+    if previous and all(previous.get(k) == fp[k] for k in ("path", "size", "mtime")) and previous.get("sha256"):
+        fp["sha256"] = previous["sha256"]
+    else:
+        fp["sha256"] = _sha256_file(path)
+    return fp
+
+
+def frame_digest(df: pd.DataFrame | None) -> str:
+    """Content hash of a DataFrame (values + column names), order-sensitive."""
+    h = hashlib.sha256()
+    if df is None:
+        return h.hexdigest()
+    h.update("\x1f".join(map(str, df.columns)).encode("utf-8"))
+    if not df.empty:
+        h.update(pd.util.hash_pandas_object(df, index=False).to_numpy().tobytes())
+    return h.hexdigest()
+
+
+def code_digest(*modules) -> str:
+    """
+    Hash of module source files (or plain paths, e.g. mapping files), so
+    cached stages rebuild after code or config edits.
+    """
+    h = hashlib.sha256()
+    for mod in modules:
+        h.update(Path(getattr(mod, "__file__", mod)).read_bytes())
+    return h.hexdigest()
+
+
+def _restore_missing(df: pd.DataFrame) -> pd.DataFrame:
+    # Arrow hands string nulls back as None; parsers produce NaN.
+    for c in df.columns[df.dtypes.eq(object)]:
+        s = df[c]
+        if s.isna().any():
+            df[c] = s.where(s.notna(), np.nan)
+    return df
+
+
+def cached_parse(path: str | Path, parse: Callable[[], pd.DataFrame], *, cache_dir: str | Path | None = None) -> pd.DataFrame:
+    """
+    Return `parse()` for a raw input file, via a columnar copy keyed by the
+    file's path, size and mtime.
+
+    The first call parses the file and writes CACHE_DIR/inputs/<path>-<version>.parquet
+    (pickle when pyarrow is missing or the frame has no Arrow representation,
+    e.g. mixed-type Excel columns). Later calls, including notebooks, load
+    that copy until the source file changes; stale versions are deleted.
+    """
+    path = Path(path)
+    st = path.stat()
+    cache_dir = Path(cache_dir) if cache_dir else CACHE_DIR / "inputs"
+    cache_dir.mkdir(parents=True, exist_ok=True)
+
+    path_key = hashlib.sha1(str(path.resolve()).encode("utf-8")).hexdigest()[:12]
+    version = hashlib.sha1(f"{st.st_size}|{st.st_mtime_ns}".encode("utf-8")).hexdigest()[:12]
+    stem = f"{path_key}-{version}"
+
+    parquet_file = cache_dir / f"{stem}.parquet"
+    pickle_file = cache_dir / f"{stem}.pkl"
+    try:
+        if HAVE_PYARROW and parquet_file.exists():
+            return _restore_missing(pd.read_parquet(parquet_file))
+        if pickle_file.exists():
+            return pd.read_pickle(pickle_file)
+    except Exception as exc:
+        log.warning("input cache for %s unreadable (%s); re-parsing", path.name, exc)
+
+    df = parse()
+
+    for old in cache_dir.glob(f"{path_key}-*"):
+        old.unlink(missing_ok=True)
+    try:
+        if not HAVE_PYARROW:
+            raise ImportError("pyarrow not installed")
+        df.to_parquet(parquet_file, index=False)
+    except Exception:
+        parquet_file.unlink(missing_ok=True)
+        df.to_pickle(pickle_file)
+    log.info("cached parsed input %s (%d rows)", path.name, len(df))
+    return df
+
+
+class RunManifest:
+    """
+    Tracks input fingerprints and cached intermediate frames between ETL runs.
+
+    manifest.json layout:
+      {"inputs": {name: fingerprint}, "stages": {name: {"deps", "file", "rows", "built_at"}}}
+
+    `stage(name, deps, build)` returns the cached frame when the recorded deps
+    match `deps` exactly, otherwise calls `build()` and stores the result.
+    """
+
+    def __init__(self, cache_dir: str | Path = CACHE_DIR, *, force: bool = False):
+        self.dir = Path(cache_dir)
+        self.dir.mkdir(parents=True, exist_ok=True)
+        self.path = self.dir / "manifest.json"
+        self.force = force
+        self.data: dict = {"inputs": {}, "stages": {}}
+        if self.path.exists():
+            try:
+                self.data = json.loads(self.path.read_text(encoding="utf-8"))
+            except (OSError, ValueError):
+                log.warning("Ignoring unreadable run manifest %s", self.path)
+        self.data.setdefault("inputs", {})
+        self.data.setdefault("stages", {})
+
+    def fingerprint(self, name: str, path: str | Path) -> str:
+        """Record the current fingerprint of an input file and return its content hash."""
+        fp = file_fingerprint(path, self.data["inputs"].get(name))
+        self.data["inputs"][name] = fp
+        return fp["sha256"]
+
+    def stage(self, name: str, deps: dict[str, str], build: Callable[[], pd.DataFrame]) -> pd.DataFrame:
+        entry = self.data["stages"].get(name)
+        file = self.dir / f"{name}.pkl"
+        if not self.force and entry and entry.get("deps") == deps and file.exists():
+            try:
+                df = pd.read_pickle(file)
+                log.info("stage %s: inputs unchanged, reused %d cached rows", name, len(df))
+                return df
+            except Exception as exc:
+                log.warning("stage %s: cache unreadable (%s); rebuilding", name, exc)
+
+        df = build()
+        df.to_pickle(file)
+        self.data["stages"][name] = {
+            "deps": deps,
+            "file": file.name,
+            "rows": int(len(df)),
+            "built_at": datetime.now().isoformat(timespec="seconds"),
+        }
+        log.info("stage %s: rebuilt (%d rows)", name, len(df))
+        return df
+
+    def save(self):
+        tmp = self.path.with_suffix(".json.tmp")
+        tmp.write_text(json.dumps(self.data, indent=2), encoding="utf-8")
+        os.replace(tmp, self.path)
+
+
+class KeyedCache:
+    """
+    Small persistent memo table: {key: JSON value} in one JSON file.
+
+    Entries are namespaced by `version`; a file written under another version
+    is ignored, so bumping it invalidates every entry. `get`/`put` work on the
+    in-memory dict; `save()` writes atomically and only when something changed.
+    """
+
+    def __init__(self, path: str | Path, version: str):
+        self.path = Path(path)
+        self.version = version
+        self.entries: dict = {}
+        self.dirty = False
+        if self.path.exists():
+            try:
+                data = json.loads(self.path.read_text(encoding="utf-8"))
+                if data.get("version") == version:
+                    self.entries = data.get("entries", {})
+            except (OSError, ValueError):
+                log.warning("Ignoring unreadable cache %s", self.path)
+
+    @staticmethod
+    def key(text: str) -> str:
+        return hashlib.sha1(text.encode("utf-8")).hexdigest()
+
+    def get(self, key: str, default=None):
+        return self.entries.get(key, default)
+
+    def put(self, key: str, value) -> None:
+        self.entries[key] = value
+        self.dirty = True
+
+    def __len__(self) -> int:
+        return len(self.entries)
+
+    def save(self):
+        if not self.dirty:
+            return
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        tmp = self.path.with_suffix(f"{self.path.suffix}.{os.getpid()}.tmp")
+        tmp.write_text(json.dumps({"version": self.version, "entries": self.entries}), encoding="utf-8")
+        os.replace(tmp, self.path)
+        self.dirty = False
+
+
+__all__ = ["CACHE_DIR", "KeyedCache", "RunManifest", "cached_parse", "code_digest", "file_fingerprint", "frame_digest"]
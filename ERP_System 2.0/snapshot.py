@@ -0,0 +1,219 @@
+"""
+Versioned local snapshots of the ETL output tables (ETL -> web server handoff).
+
+Layout under SNAPSHOT_DIR:
+    <version>/manifest.json     {"version", "created_at", "tables": {name: {"file", "format", "rows", "columns", "sha1"}}}
+    <version>/<table>.arrow     Arrow IPC file, uncompressed so readers can memory-map it
+    CURRENT                     name of the newest complete version
+
+A version directory is written under a temporary name and renamed into place
+before CURRENT is switched, so readers only ever see complete snapshots.
+A reader that keeps using a version pins it (<version>/.pin-<owner>); pruning
+skips versions with a pin touched in the last PIN_TTL seconds.
+Tables with no Arrow representation (e.g. mixed-type object columns) are
+stored as pickle instead, like run_cache.cached_parse does. Each table's
+sha1 (of its file) tells readers whether it changed since an older version.
+"""
+from __future__ import annotations
+
+import hashlib
+import json
+import logging
+import os
+import re
+import shutil
+import time
+from datetime import datetime
+from pathlib import Path
+from typing import Iterable
+
+import pandas as pd
+
+from run_cache import CACHE_DIR
+
+try:
+    # Optional: Arrow IPC needs pyarrow; without it every table is pickled.
+    import pyarrow as pa  # type: ignore
+    HAVE_PYARROW = True
+except ImportError:
+    pa = None
+    HAVE_PYARROW = False
+
+# Override with ERP_SNAPSHOT_DIR to share snapshots between machines/users.
+SNAPSHOT_DIR = Path(os.getenv("ERP_SNAPSHOT_DIR") or CACHE_DIR / "snapshots")
+KEEP_VERSIONS = 3
+# Readers refresh their pins while running; a crashed reader's pin expires
+PIN_TTL = 3600
+
+log = logging.getLogger(__name__)
+
+
+def _file_stem(table: str) -> str:
+    return re.sub(r"[^A-Za-z0-9_.-]+", "_", table)
+
+
+def _write_arrow(df: pd.DataFrame, path: Path):
+    table = pa.Table.from_pandas(df, preserve_index=False)
+    with pa.OSFile(str(path), "wb") as sink, pa.ipc.new_file(sink, table.schema) as writer:
+        writer.write_table(table)
+
+
+def _read_arrow(path: Path, columns: list[str] | None = None) -> pd.DataFrame:
+    with pa.memory_map(str(path), "r") as source:
+        table = pa.ipc.open_file(source).read_all()
+        if columns is not None:
+            # Only the selected columns are converted (the rest stay unmapped)
+            table = table.select(columns)
+        return table.to_pandas()
+
+
+def _file_sha1(path: Path) -> str:
+    digest = hashlib.sha1()
+    with open(path, "rb") as fh:
+        for chunk in iter(lambda: fh.read(1 << 20), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def current_version(snapshot_dir: str | Path | None = None) -> str | None:
+    """Name of the newest complete snapshot, or None if there is none."""
+    pointer = Path(snapshot_dir or SNAPSHOT_DIR) / "CURRENT"
+    try:
+        version = pointer.read_text(encoding="utf-8").strip()
+    except OSError:
+        return None
+    return version or None
+
+
+def write_snapshot(frames: dict[str, pd.DataFrame], snapshot_dir: str | Path | None = None) -> str:
+    """Write `frames` as a new snapshot version, make it CURRENT and return its name."""
+    root = Path(snapshot_dir or SNAPSHOT_DIR)
+    root.mkdir(parents=True, exist_ok=True)
+    version = datetime.now().strftime("%Y%m%dT%H%M%S%f")
+    tmp_dir = root / f".{version}.tmp"
+    tmp_dir.mkdir()
+
+    tables = {}
+    for name, df in frames.items():
+        stem = _file_stem(name)
+        entry = {"rows": int(len(df)), "columns": [str(c) for c in df.columns]}
+        try:
+            if not HAVE_PYARROW:
+                raise ImportError("pyarrow not installed")
+            _write_arrow(df, tmp_dir / f"{stem}.arrow")
+            entry.update(file=f"{stem}.arrow", format="arrow")
+        except Exception as exc:
+            (tmp_dir / f"{stem}.arrow").unlink(missing_ok=True)
+            log.info("snapshot: %s stored as pickle (%s)", name, exc)
+            df.to_pickle(tmp_dir / f"{stem}.pkl")
+            entry.update(file=f"{stem}.pkl", format="pickle")
+        entry["sha1"] = _file_sha1(tmp_dir / entry["file"])
+        tables[name] = entry
+
+    manifest = {"version": version, "created_at": datetime.now().isoformat(timespec="seconds"), "tables": tables}
+    (tmp_dir / "manifest.json").write_text(json.dumps(manifest, indent=2), encoding="utf-8")
+    os.replace(tmp_dir, root / version)
+
+    pointer_tmp = root / f"CURRENT.{os.getpid()}.tmp"
+    pointer_tmp.write_text(version, encoding="utf-8")
+    os.replace(pointer_tmp, root / "CURRENT")
+
+    _prune(root, keep=version)
+    log.info("snapshot %s written (%d tables)", version, len(tables))
+    return version
+
+
+def _pinned(vdir: Path) -> bool:
+    cutoff = time.time() - PIN_TTL
+    for pin in vdir.glob(".pin-*"):
+        try:
+            if pin.stat().st_mtime >= cutoff:
+                return True
+        except OSError:
+            pass
+    return False
+
+
+def pin_version(version: str, owner: str, snapshot_dir: str | Path | None = None) -> bool:
+    """Keep `version` from being pruned while `owner` uses it (call again to refresh); False if it is gone."""
+    vdir = Path(snapshot_dir or SNAPSHOT_DIR) / version
+    try:
+        (vdir / f".pin-{_file_stem(owner)}").touch()
+    except OSError:
+        return False
+    return True
+
+
+def unpin_version(version: str, owner: str, snapshot_dir: str | Path | None = None):
+    pin = Path(snapshot_dir or SNAPSHOT_DIR) / version / f".pin-{_file_stem(owner)}"
+    try:
+        pin.unlink(missing_ok=True)
+    except OSError:
+        pass
+
+
+def _prune(root: Path, keep: str):
+    versions = sorted(p for p in root.iterdir() if p.is_dir() and not p.name.startswith("."))
+    for old in versions[:-KEEP_VERSIONS]:
+        if old.name == keep or _pinned(old):
+            continue
+        # A reader may still have files open (Windows refuses); retry next run
+        shutil.rmtree(old, ignore_errors=True)
+
+
+def read_manifest(snapshot_dir: str | Path | None = None, version: str | None = None) -> dict | None:
+    """Manifest of a snapshot (CURRENT unless `version` is given), or None if there is none."""
+    root = Path(snapshot_dir or SNAPSHOT_DIR)
+    version = version or current_version(root)
+    if version is None:
+        return None
+    return json.loads((root / version / "manifest.json").read_text(encoding="utf-8"))
+
+
+def read_snapshot(
+    tables: Iterable[str] | None = None,
+    snapshot_dir: str | Path | None = None,
+    version: str | None = None,
+    columns: dict[str, Iterable[str]] | None = None,
+) -> tuple[str, dict[str, pd.DataFrame]] | None:
+    """
+    Load tables from a snapshot (CURRENT unless `version` is given).
+
+    Returns (version, {table: DataFrame}) with dtypes as the ETL produced them,
+    or None when there is no snapshot. Tables missing from the snapshot are
+    left out of the dict; the caller decides whether that is fatal.
+    `columns` maps a table to the columns to read (in file order; names the
+    table does not have are ignored); other tables are read whole.
+    """
+    root = Path(snapshot_dir or SNAPSHOT_DIR)
+    manifest = read_manifest(root, version)
+    if manifest is None:
+        return None
+    vdir = root / manifest["version"]
+
+    wanted = manifest["tables"] if tables is None else [t for t in tables if t in manifest["tables"]]
+    out: dict[str, pd.DataFrame] = {}
+    for name in wanted:
+        entry = manifest["tables"][name]
+        path = vdir / entry["file"]
+        selected = None
+        if columns is not None and name in columns:
+            keep = set(columns[name])
+            selected = [c for c in entry["columns"] if c in keep]
+        if entry["format"] == "arrow":
+            out[name] = _read_arrow(path, selected)
+        else:
+            df = pd.read_pickle(path)
+            out[name] = df if selected is None else df[selected]
+    return manifest["version"], out
+
+
+__all__ = [
+    "SNAPSHOT_DIR",
+    "current_version",
+    "pin_version",
+    "read_manifest",
+    "read_snapshot",
+    "unpin_version",
+    "write_snapshot",
+]
@@ -0,0 +1,212 @@
+"""
+Compact in-memory dtypes for the frames each data generation holds.
+
+read_sql hands text over as object columns with one Python str per cell
+(snapshots at least share repeated strings) and numbers as 64-bit; for a
+worker loading from the database that is most of its resident memory.
+compact_frame stores each distinct string once and narrows integer columns.
+What the handlers render does not change:
+
+- repetitive text columns become categoricals whose categories are sorted
+  (sorts and groupbys keep the object order) and include "" (handlers
+  fillna("") before astype(str))
+- text columns holding None / pd.NA, which stringify differently from NaN,
+  and mostly-distinct ones stay object, with equal strings sharing one object
+- int64 columns whose values fit become int32 (pandas still sums them in
+  int64); floats stay float64, since float32 sums are rounded to float32
+
+Run `python frame_schema.py` to see the per-table effect on the current
+ETL snapshot.
+"""
+from __future__ import annotations
+
+import ctypes
+import gc
+import sys
+import time
+from dataclasses import dataclass
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+try:
+    # Optional: resident set size for the load report
+    import psutil  # type: ignore
+    HAVE_PSUTIL = True
+except ImportError:
+    HAVE_PSUTIL = False
+
+# Text columns with at most this share of distinct values become categoricals
+CATEGORY_MAX_RATIO = 0.5
+
+
+def _fresh(s: str) -> str:
+    # A new str object with the same value
+    return s.encode("utf-8", "surrogatepass").decode("utf-8", "surrogatepass")
+
+
+def _compact_text(col: pd.Series) -> pd.Series | None:
+    """
+    Categorical when every missing value is NaN (None / pd.NA stringify
+    differently); otherwise an object column whose equal strings share one
+    object. Either way the strings are fresh copies: read_sql allocates each
+    row's cells together, and a single surviving cell would keep the memory
+    of all the others from being returned.
+    """
+    if col.dtype != object or len(col) < 2:
+        return None
+    values = col.to_numpy()
+    missing = col.isna().to_numpy()
+    present = values[~missing]
+    if pd.api.types.infer_dtype(present, skipna=False) not in ("string", "empty"):
+        return None
+    codes, uniques = pd.factorize(present)
+    fresh = np.array([_fresh(u) for u in uniques], dtype=object)
+    nan_only = not missing.any() or all(isinstance(v, float) for v in values[missing])
+    if nan_only and len(uniques) <= CATEGORY_MAX_RATIO * len(col):
+        categories = sorted(set(fresh) | {""})
+        cat_codes = np.full(len(col), -1, dtype=np.int64)
+        order = pd.Index(categories).get_indexer(fresh)
+        cat_codes[~missing] = order[codes]
+        cat = pd.Categorical.from_codes(cat_codes, categories=categories)
+        return pd.Series(cat, index=col.index, name=col.name)
+    out = values.copy()
+    out[~missing] = fresh[codes]
+    return pd.Series(out, index=col.index, name=col.name)
+
+
+def _narrowed(col: pd.Series) -> pd.Series | None:
+    if col.dtype != np.int64 or not len(col):
+        return None
+    info = np.iinfo(np.int32)
+    if col.min() < info.min or col.max() > info.max:
+        return None
+    return col.astype(np.int32)
+
+
+def _compact_columns(df: pd.DataFrame | None) -> tuple[pd.DataFrame | None, int]:
+    if df is None or df.empty:
+        return df, 0
+    out = df.copy(deep=False)
+    replaced = 0
+    for i in range(df.shape[1]):
+        col = df.iloc[:, i]
+        new = _compact_text(col)
+        if new is None:
+            new = _narrowed(col)
+        if new is not None:
+            out.isetitem(i, new)
+            replaced += 1
+    return out, replaced
+
+
+def compact_frame(df: pd.DataFrame | None) -> pd.DataFrame | None:
+    """Copy of `df` with compact columns (the input is not modified)."""
+    return _compact_columns(df)[0]
+
+
+def frame_nbytes(df: pd.DataFrame | None) -> int:
+    """
+    Bytes held by `df`. Unlike memory_usage(deep=True), an object shared by
+    many cells (snapshots deduplicate strings) is counted once.
+    """
+    if df is None:
+        return 0
+    total = int(df.memory_usage(deep=False).sum())
+    for i in range(df.shape[1]):
+        col = df.iloc[:, i]
+        if col.dtype == object:
+            distinct = {id(v): v for v in col.to_numpy()}
+            total += sum(sys.getsizeof(v) for v in distinct.values())
+        elif isinstance(col.dtype, pd.CategoricalDtype):
+            total += int(col.memory_usage(deep=True, index=False) - col.memory_usage(deep=False, index=False))
+    return total
+
+
+def trim_heap():
+    """Hand freed heap pages back to the OS (glibc only; a no-op elsewhere)."""
+    if not sys.platform.startswith("linux"):
+        return
+    try:
+        ctypes.CDLL("libc.so.6").malloc_trim(0)
+    except (OSError, AttributeError):
+        pass
+
+
+def rss_bytes() -> int | None:
+    """Resident set size of this process (None without psutil)."""
+    if not HAVE_PSUTIL:
+        return None
+    return psutil.Process().memory_info().rss
+
+
+@dataclass(frozen=True)
+class CompactStats:
+    columns: int            # columns replaced by a compact version
+    seconds: float
+    rss_before: int | None
+    rss_after: int | None
+
+    def describe(self) -> str:
+        text = f"{self.columns} column(s) in {self.seconds:.2f}s"
+        if self.rss_before is not None and self.rss_after is not None:
+            mb = 1024 * 1024
+            text += f", RSS {self.rss_before / mb:.0f} MB -> {self.rss_after / mb:.0f} MB"
+        return text
+
+
+def compact_tables(tables: dict[str, pd.DataFrame]) -> CompactStats:
+    """
+    compact_frame every table in place (dict values replaced). Callers drop
+    their own references to the frames first, so that the raw ones are freed.
+    """
+    t0 = time.perf_counter()
+    rss_before = rss_bytes()
+    columns = 0
+    for name in list(tables):
+        tables[name], replaced = _compact_columns(tables[name])
+        columns += replaced
+    gc.collect()
+    # Without this glibc keeps the raw frames' pages and RSS does not move
+    trim_heap()
+    return CompactStats(columns, time.perf_counter() - t0, rss_before, rss_bytes())
+
+
+def main():
+    erp_dir = Path(__file__).resolve().parents[1] / "ERP_System 2.0"
+    if str(erp_dir) not in sys.path:
+        sys.path.append(str(erp_dir))
+    from snapshot import read_snapshot
+
+    snap = read_snapshot()
+    if snap is None:
+        print("No ETL snapshot found (see snapshot.py / ERP_SNAPSHOT_DIR).")
+        return 1
+    version, tables = snap
+    print(f"snapshot {version}")
+    before = after = 0
+    for name, df in sorted(tables.items()):
+        compact, changed = _compact_columns(df)
+        b, a = frame_nbytes(df), frame_nbytes(compact)
+        before, after = before + b, after + a
+        print(f"  {name:28s} {len(df):8d} rows  {b / 1e6:8.2f} MB -> {a / 1e6:8.2f} MB  ({changed} column(s))")
+    print(f"  {'total':28s} {'':8s}       {before / 1e6:8.2f} MB -> {after / 1e6:8.2f} MB")
+    stats = compact_tables(tables)
+    print(f"compact_tables: {stats.describe()}")
+    return 0
+
+
+__all__ = [
+    "CATEGORY_MAX_RATIO",
+    "CompactStats",
+    "compact_frame",
+    "compact_tables",
+    "frame_nbytes",
+    "rss_bytes",
+    "trim_heap",
+]
+
+
+if __name__ == "__main__":
+    sys.exit(main())
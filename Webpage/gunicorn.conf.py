@@ -0,0 +1,36 @@
+"""
+gunicorn settings for the ERP web app (Linux only; use `python wsgi.py` on Windows).
+
+    cd Webpage && gunicorn -c gunicorn.conf.py wsgi:app
+
+preload_app imports wsgi once in the master, which reads every table there
+(ERP_PRELOAD defaults to "all" here); forked workers share those pages
+copy-on-write instead of each loading them on first use. Each worker then
+reloads on its own when the reload poller sees a new ETL run. Override with
+ERP_BIND, ERP_WORKERS, ERP_THREADS, ERP_TIMEOUT and ERP_PRELOAD.
+"""
+import gc
+import multiprocessing
+import os
+
+os.environ.setdefault("ERP_PRELOAD", "all")
+
+chdir = os.path.dirname(os.path.abspath(__file__))
+bind = os.getenv("ERP_BIND", "0.0.0.0:5002")
+workers = int(os.getenv("ERP_WORKERS") or min(multiprocessing.cpu_count() + 1, 8))
+worker_class = "gthread"
+threads = int(os.getenv("ERP_THREADS", "4"))
+timeout = int(os.getenv("ERP_TIMEOUT", "120"))
+preload_app = True
+accesslog = "-"
+
+
+def when_ready(arbiter):
+    # Keep the GC from touching (and so un-sharing) the preloaded objects in workers
+    gc.freeze()
+
+
+def post_fork(arbiter, worker):
+    import server as erp_server
+
+    erp_server.after_fork()
@@ -0,0 +1,332 @@
+"""
+Lookup indexes built once per data load (see server.DataGeneration).
+
+Request handlers slice frames by row position instead of scanning whole
+columns. The row indexes reproduce the comparisons the handlers used
+before, so results (including row order) are unchanged. SuggestIndex
+backs /api/item_suggest; DescriptionIndex answers the description lookups
+of the item pages.
+"""
+from __future__ import annotations
+
+from bisect import bisect_left
+from dataclasses import dataclass
+from functools import lru_cache
+from pathlib import Path
+from typing import Iterable
+
+import numpy as np
+import pandas as pd
+
+try:
+    # Optional: fuzzy fallback for /api/item_suggest
+    from rapidfuzz import fuzz, process  # type: ignore
+    HAVE_RAPIDFUZZ = True
+except ImportError:
+    HAVE_RAPIDFUZZ = False
+
+_EMPTY = np.empty(0, dtype=np.intp)
+
+
+class RowIndex:
+    """Exact-match index: key -> ascending row positions."""
+
+    def __init__(self, keys: pd.Series):
+        keys = keys.reset_index(drop=True)
+        self._pos: dict = keys.groupby(keys.to_numpy(), sort=False).indices if len(keys) else {}
+
+    def positions(self, key) -> np.ndarray:
+        return self._pos.get(key, _EMPTY)
+
+    def take(self, df: pd.DataFrame, key) -> pd.DataFrame:
+        return df.iloc[self.positions(key)]
+
+    def __len__(self) -> int:
+        return len(self._pos)
+
+
+class NameIndex:
+    """
+    Substring index over a low-cardinality text column (customer names).
+    `positions(q)` equals the positions of
+    `col.astype(str).str.contains(q, case=False, na=False)`, but the
+    pattern is only evaluated once per distinct name.
+    """
+
+    def __init__(self, col: pd.Series):
+        codes, uniques = pd.factorize(col.astype(str).reset_index(drop=True))
+        self._names = pd.Series(uniques, dtype=object)
+        order = np.argsort(codes, kind="stable")
+        bounds = np.searchsorted(codes[order], np.arange(len(uniques) + 1))
+        self._rows = [order[bounds[i]:bounds[i + 1]] for i in range(len(uniques))]
+
+    def positions(self, pattern: str) -> np.ndarray:
+        if not len(self._names):
+            return _EMPTY
+        hits = np.flatnonzero(self._names.str.contains(pattern, case=False, na=False).to_numpy())
+        if not len(hits):
+            return _EMPTY
+        return np.sort(np.concatenate([self._rows[i] for i in hits]))
+
+    def take(self, df: pd.DataFrame, pattern: str) -> pd.DataFrame:
+        return df.iloc[self.positions(pattern)]
+
+
+# Patterns with any of these go through the regex engine (str.contains) as before
+_REGEX_META = frozenset(".^$*+?{}[]\\|()")
+
+# Stop intersecting posting lists once this few candidates remain
+_VERIFY_AT = 64
+
+
+def _grouped(codes: np.ndarray, n: int, values: np.ndarray) -> list[np.ndarray]:
+    """values grouped by code (0..n-1), each group in ascending order of values."""
+    order = np.lexsort((values, codes))
+    bounds = np.searchsorted(codes[order], np.arange(n + 1))
+    vals = values[order]
+    return [vals[bounds[i]:bounds[i + 1]] for i in range(n)]
+
+
+class DescriptionIndex:
+    """
+    Substring index over a free-text column (NAV / open-PO descriptions).
+    `positions(p)` equals the positions of
+    `col.astype(str).str.lower().str.contains(p, na=False)`.
+
+    Descriptions are cut at commas, the component separator of
+    ledger.parse_description ("Parent, Including: 2x A, 1x B"), and each
+    distinct piece is indexed once: trigram -> pieces, piece -> texts. A
+    pattern without a comma lies inside one piece, so it is answered by
+    intersecting its trigram lists (rarest first), checking `p in piece` on
+    what is left and taking those pieces' texts. Patterns with a comma scan
+    the distinct texts; patterns with regex metacharacters use str.contains,
+    so they (and invalid ones) behave exactly as before.
+    """
+
+    def __init__(self, col: pd.Series):
+        texts = col.astype(str).str.lower().reset_index(drop=True)
+        self._texts = texts
+        codes, uniques = pd.factorize(texts)
+        self.uniques: list[str] = list(uniques)
+        self._rows = _grouped(codes, len(uniques), np.arange(len(codes), dtype=np.intp))
+
+        piece_ids: dict[str, int] = {}
+        piece_of, text_of = [], []
+        for t, text in enumerate(self.uniques):
+            for piece in set(text.split(",")):
+                piece_of.append(piece_ids.setdefault(piece, len(piece_ids)))
+                text_of.append(t)
+        self.pieces: list[str] = list(piece_ids)
+        self._texts_of_piece = _grouped(
+            np.asarray(piece_of, dtype=np.intp), len(self.pieces), np.asarray(text_of, dtype=np.intp)
+        )
+
+        postings: dict[str, list[int]] = {}
+        for i, piece in enumerate(self.pieces):
+            for gram in {piece[j:j + 3] for j in range(len(piece) - 2)}:
+                postings.setdefault(gram, []).append(i)
+        self._grams = {g: np.asarray(ids, dtype=np.int32) for g, ids in postings.items()}
+
+    def __len__(self) -> int:
+        return len(self.uniques)
+
+    def _piece_ids(self, p: str) -> list[int]:
+        if len(p) < 3:
+            return [i for i, piece in enumerate(self.pieces) if p in piece]
+        lists = []
+        for gram in {p[j:j + 3] for j in range(len(p) - 2)}:
+            ids = self._grams.get(gram)
+            if ids is None:
+                return []
+            lists.append(ids)
+        lists.sort(key=len)
+        cand = lists[0]
+        for ids in lists[1:]:
+            if len(cand) <= _VERIFY_AT:
+                break
+            cand = np.intersect1d(cand, ids, assume_unique=True)
+        return [int(i) for i in cand if p in self.pieces[i]]
+
+    def _text_ids(self, p: str) -> np.ndarray:
+        if "," in p:
+            return np.asarray([i for i, text in enumerate(self.uniques) if p in text], dtype=np.intp)
+        hits = self._piece_ids(p)
+        if not hits:
+            return _EMPTY
+        return np.unique(np.concatenate([self._texts_of_piece[i] for i in hits]))
+
+    def positions(self, pattern: str) -> np.ndarray:
+        if not pattern or _REGEX_META.intersection(pattern):
+            return np.flatnonzero(self._texts.str.contains(pattern, na=False).to_numpy())
+        text_ids = self._text_ids(pattern)
+        if not len(text_ids):
+            return _EMPTY
+        return np.sort(np.concatenate([self._rows[i] for i in text_ids]))
+
+
+@dataclass(frozen=True)
+class SoIndex:
+    """Indexes over the SO_INV (wo_structured) frame."""
+    by_item: RowIndex        # str(Item)
+    by_so: RowIndex          # str(QB Num).upper()
+    by_name: NameIndex | None
+
+    def item_rows(self, so_inv: pd.DataFrame, item: str) -> pd.DataFrame:
+        return self.by_item.take(so_inv, item)
+
+    def so_rows(self, so_inv: pd.DataFrame, so_num: str) -> pd.DataFrame:
+        return self.by_so.take(so_inv, so_num.upper())
+
+    def item_so_rows(self, so_inv: pd.DataFrame, item: str, so_num: str) -> pd.DataFrame:
+        pos = np.intersect1d(self.by_item.positions(item), self.by_so.positions(so_num.upper()))
+        return so_inv.iloc[pos]
+
+    def name_rows(self, so_inv: pd.DataFrame, pattern: str) -> pd.DataFrame:
+        if self.by_name is None:
+            return so_inv.iloc[_EMPTY]
+        return self.by_name.take(so_inv, pattern)
+
+
+def build_so_index(so_inv: pd.DataFrame) -> SoIndex:
+    def col(name: str) -> pd.Series:
+        if name in so_inv.columns:
+            return so_inv[name].astype(str)
+        return pd.Series([""] * len(so_inv), dtype=object)
+
+    return SoIndex(
+        by_item=RowIndex(col("Item")),
+        by_so=RowIndex(col("QB Num").str.upper()),
+        by_name=NameIndex(so_inv["Name"]) if "Name" in so_inv.columns else None,
+    )
+
+
+def build_description_index(df: pd.DataFrame | None, col: str | None = None) -> DescriptionIndex | None:
+    """DescriptionIndex over `col`, or the first column named "description" (any case)."""
+    if df is None:
+        return None
+    if col is None:
+        col = next((c for c in df.columns if str(c).lower() == "description"), None)
+    if col is None or col not in df.columns:
+        return None
+    return DescriptionIndex(df[col])
+
+
+def build_lower_item_index(df: pd.DataFrame) -> RowIndex | None:
+    """str(item).lower() -> positions, for the first column named "item" (any case)."""
+    item_col = next((c for c in df.columns if str(c).lower() == "item"), None)
+    if item_col is None:
+        return None
+    return RowIndex(df[item_col].astype(str).str.lower())
+
+
+# QuickBooks item types that are real parts (skips services, tax, discounts...)
+LISTING_PART_TYPES = {"Inventory Part", "Inventory Assembly", "Non-inventory Part", "Group"}
+
+
+@lru_cache(maxsize=4)
+def _read_item_listing(path: str, mtime_ns: int) -> tuple[str, ...]:
+    df = pd.read_csv(path, usecols=["Item", "Type"], dtype=str, encoding_errors="ignore")
+    df = df[df["Type"].isin(LISTING_PART_TYPES)]
+    # QuickBooks full names are "Category:Part"; orders use the part name
+    names = df["Item"].dropna().str.rsplit(":", n=1).str[-1].str.strip()
+    return tuple(names[names.ne("")].unique())
+
+
+def load_item_listing(path: str | Path) -> tuple[str, ...]:
+    """Part names from a QuickBooks "Item Listing" CSV export (re-read when the file changes)."""
+    path = Path(path)
+    try:
+        st = path.stat()
+    except OSError:
+        return ()
+    return _read_item_listing(str(path), st.st_mtime_ns)
+
+
+class SuggestIndex:
+    """
+    Autocomplete over part names, built once per load.
+
+    - prefix matches: binary search in the sorted lower-cased names
+    - substring matches: trigram posting lists intersected, then verified
+      with `in` (queries under 3 chars scan the names)
+    - optional fuzzy fill-in with RapidFuzz when the above find too few
+    Results: prefix hits, then substring hits (both alphabetical), then fuzzy.
+    """
+
+    def __init__(self, names: Iterable[str]):
+        uniq = {str(n).strip() for n in names}
+        uniq.discard("")
+        uniq.discard("nan")
+        pairs = sorted((n.lower(), n) for n in uniq)
+        self.lower = [lo for lo, _ in pairs]
+        self.names = [n for _, n in pairs]
+
+        postings: dict[str, list[int]] = {}
+        for i, lo in enumerate(self.lower):
+            for gram in {lo[j:j + 3] for j in range(len(lo) - 2)}:
+                postings.setdefault(gram, []).append(i)
+        self._grams = {g: np.asarray(ids, dtype=np.int32) for g, ids in postings.items()}
+
+    def __len__(self) -> int:
+        return len(self.names)
+
+    def _prefix(self, ql: str, limit: int) -> list[int]:
+        out = []
+        i = bisect_left(self.lower, ql)
+        while i < len(self.lower) and len(out) < limit and self.lower[i].startswith(ql):
+            out.append(i)
+            i += 1
+        return out
+
+    def _contains(self, ql: str) -> list[int]:
+        if len(ql) < 3:
+            return [i for i, lo in enumerate(self.lower) if ql in lo]
+        grams = {ql[j:j + 3] for j in range(len(ql) - 2)}
+        lists = []
+        for gram in grams:
+            ids = self._grams.get(gram)
+            if ids is None:
+                return []
+            lists.append(ids)
+        lists.sort(key=len)
+        cand = lists[0]
+        for ids in lists[1:]:
+            cand = np.intersect1d(cand, ids, assume_unique=True)
+            if not len(cand):
+                return []
+        return [int(i) for i in cand if ql in self.lower[i]]
+
+    def suggest(self, q: str, limit: int = 20, *, fuzzy: bool = True) -> list[str]:
+        ql = q.strip().lower()
+        if not ql:
+            return []
+        picked = self._prefix(ql, limit)
+        if len(picked) < limit:
+            seen = set(picked)
+            for i in self._contains(ql):
+                if i not in seen:
+                    picked.append(i)
+                    seen.add(i)
+                    if len(picked) >= limit:
+                        break
+        if fuzzy and HAVE_RAPIDFUZZ and len(picked) < limit and len(ql) >= 3:
+            seen = set(picked)
+            for _, _, i in process.extract(ql, self.lower, scorer=fuzz.WRatio, limit=limit, score_cutoff=80):
+                if i not in seen:
+                    picked.append(i)
+                    if len(picked) >= limit:
+                        break
+        return [self.names[i] for i in picked]
+
+
+__all__ = [
+    "DescriptionIndex",
+    "NameIndex",
+    "RowIndex",
+    "SoIndex",
+    "SuggestIndex",
+    "build_description_index",
+    "build_lower_item_index",
+    "build_so_index",
+    "load_item_listing",
+]
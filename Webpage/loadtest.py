@@ -0,0 +1,147 @@
+"""
+Replay warehouse traffic against a running ERP web app and report latency.
+
+Mix (by weight): SO lookups on / (3), /api/item_overview (4) and
+/quotation_lookup (2). SO numbers and items are sampled from the current
+ETL snapshot when there is one, else from /api/item_suggest.
+
+    python loadtest.py [--base-url http://127.0.0.1:5002] [--concurrency 16]
+                       [--duration 30] [--warmup 3]
+
+Compare `python server.py` (dev server) with `python wsgi.py` or gunicorn.
+"""
+from __future__ import annotations
+
+import argparse
+import random
+import string
+import sys
+import threading
+import time
+import urllib.error
+import urllib.parse
+import urllib.request
+from collections import defaultdict
+from pathlib import Path
+
+ERP_MODULE_DIR = Path(__file__).resolve().parents[1] / "ERP_System 2.0"
+
+MIX = (("/", 3), ("/api/item_overview", 4), ("/quotation_lookup", 2))
+
+
+def _sample_from_snapshot(n: int) -> tuple[list[str], list[str]] | None:
+    if str(ERP_MODULE_DIR) not in sys.path:
+        sys.path.append(str(ERP_MODULE_DIR))
+    try:
+        from snapshot import read_snapshot
+        snap = read_snapshot(["wo_structured"])
+    except Exception:
+        return None
+    if snap is None or "wo_structured" not in snap[1]:
+        return None
+    so = snap[1]["wo_structured"]
+    items = so["Item"].dropna().astype(str).unique().tolist()
+    sos = so["QB Num"].dropna().astype(str).unique().tolist()
+    rng = random.Random(0)
+    return rng.sample(items, min(n, len(items))), rng.sample(sos, min(n, len(sos)))
+
+
+def _sample_from_server(base_url: str, n: int) -> tuple[list[str], list[str]]:
+    import json
+
+    items: list[str] = []
+    for ch in string.ascii_uppercase + string.digits:
+        url = f"{base_url}/api/item_suggest?" + urllib.parse.urlencode({"q": ch})
+        with urllib.request.urlopen(url, timeout=30) as r:
+            items.extend(json.load(r).get("items", []))
+        if len(items) >= n:
+            break
+    return items[:n], []
+
+
+def _build_urls(base_url: str, items: list[str], sos: list[str]) -> list[str]:
+    urls = []
+    for path, weight in MIX:
+        for _ in range(weight):
+            if path == "/":
+                urls += [f"{base_url}/?" + urllib.parse.urlencode({"so": s}) for s in sos] or [f"{base_url}/"]
+            elif path == "/quotation_lookup":
+                urls += [f"{base_url}{path}?" + urllib.parse.urlencode({"item": i, "qty": 1}) for i in items]
+            else:
+                urls += [f"{base_url}{path}?" + urllib.parse.urlencode({"item": i}) for i in items]
+    return urls
+
+
+def _worker(urls: list[str], stop_at: float, record, seed: int):
+    rng = random.Random(seed)
+    while time.perf_counter() < stop_at:
+        url = rng.choice(urls)
+        route = urllib.parse.urlsplit(url).path
+        t0 = time.perf_counter()
+        try:
+            with urllib.request.urlopen(url, timeout=60) as r:
+                r.read()
+                status = r.status
+        except urllib.error.HTTPError as e:
+            status = e.code
+        except Exception:
+            status = 0
+        record(route, status, time.perf_counter() - t0)
+
+
+def run(urls: list[str], concurrency: int, duration: float) -> dict[str, list[tuple[int, float]]]:
+    results: dict[str, list[tuple[int, float]]] = defaultdict(list)
+    lock = threading.Lock()
+
+    def record(route, status, elapsed):
+        with lock:
+            results[route].append((status, elapsed))
+
+    stop_at = time.perf_counter() + duration
+    threads = [threading.Thread(target=_worker, args=(urls, stop_at, record, i)) for i in range(concurrency)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    return results
+
+
+def _pct(sorted_vals: list[float], p: float) -> float:
+    return sorted_vals[min(len(sorted_vals) - 1, int(p * len(sorted_vals)))]
+
+
+def report(results: dict[str, list[tuple[int, float]]], duration: float):
+    print(f"{'route':22s} {'reqs':>7s} {'err':>5s} {'req/s':>7s} {'p50 ms':>8s} {'p95 ms':>8s} {'p99 ms':>8s}")
+    total = 0
+    for route, rows in sorted(results.items()):
+        lat = sorted(e for _, e in rows)
+        errors = sum(1 for s, _ in rows if s == 0 or s >= 500)
+        total += len(rows)
+        print(
+            f"{route:22s} {len(rows):7d} {errors:5d} {len(rows) / duration:7.1f} "
+            f"{_pct(lat, .50) * 1e3:8.1f} {_pct(lat, .95) * 1e3:8.1f} {_pct(lat, .99) * 1e3:8.1f}"
+        )
+    print(f"{'total':22s} {total:7d} {'':5s} {total / duration:7.1f}")
+
+
+def main():
+    ap = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    ap.add_argument("--base-url", default="http://127.0.0.1:5002")
+    ap.add_argument("--concurrency", type=int, default=16)
+    ap.add_argument("--duration", type=float, default=30.0, help="seconds")
+    ap.add_argument("--warmup", type=float, default=3.0, help="seconds, not reported")
+    ap.add_argument("--sample", type=int, default=200, help="distinct items / SOs to replay")
+    args = ap.parse_args()
+    base_url = args.base_url.rstrip("/")
+
+    sample = _sample_from_snapshot(args.sample) or _sample_from_server(base_url, args.sample)
+    urls = _build_urls(base_url, *sample)
+    print(f"{len(urls)} URLs, {args.concurrency} clients, {args.duration:.0f}s against {base_url}")
+
+    if args.warmup > 0:
+        run(urls, args.concurrency, args.warmup)
+    report(run(urls, args.concurrency, args.duration), args.duration)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,174 @@
+"""
+Persistent index of the PDF folder: filename stem -> path.
+
+The folder (a OneDrive-synced share holding years of PDFs) is mirrored in a
+small SQLite file, so a restart does not walk it again. refresh() only
+lists directories whose mtime changed since the last pass; a directory's
+mtime moves whenever a file in it is added, removed or renamed, so
+unchanged subtrees cost one stat() per directory. Lookups are served from an
+in-memory dict that is rebuilt (and swapped in) only when something changed.
+"""
+from __future__ import annotations
+
+import os
+import sqlite3
+import threading
+import time
+from dataclasses import dataclass
+from pathlib import Path
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS meta (k TEXT PRIMARY KEY, v TEXT);
+CREATE TABLE IF NOT EXISTS dirs (path TEXT PRIMARY KEY, parent TEXT, mtime_ns INTEGER NOT NULL);
+CREATE TABLE IF NOT EXISTS files (
+    path TEXT PRIMARY KEY,
+    dir TEXT NOT NULL,
+    stem TEXT NOT NULL,
+    file_name TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS files_dir ON files (dir);
+"""
+
+
+def key_variants(order_id: str) -> list[str]:
+    """Upper-cased stems to try for an order id, in priority order ("SO-" added / removed)."""
+    order_id = (order_id or "").strip()
+    upper = order_id.upper()
+    out: list[str] = []
+    for v in (upper, f"SO-{upper}", upper.replace("SO-", ""), upper.replace("SO", "").strip("- ")):
+        if v and v not in out:
+            out.append(v)
+    return out
+
+
+@dataclass(frozen=True)
+class RefreshStats:
+    dirs: int       # directories known after the pass
+    listed: int     # directories that had to be listed
+    files: int      # PDFs indexed
+    changed: bool
+    seconds: float
+
+
+class PdfFolderIndex:
+    """stem (upper-cased) -> {"file_name", "file_path"} for every *.pdf under `root`."""
+
+    def __init__(self, root: str | Path, db_path: str | Path):
+        self.root = os.path.abspath(str(root))
+        self.db_path = Path(db_path)
+        self.db_path.parent.mkdir(parents=True, exist_ok=True)
+        self._lock = threading.Lock()
+        self._con = sqlite3.connect(str(self.db_path), check_same_thread=False)
+        self._con.executescript(_SCHEMA)
+        with self._con:
+            row = self._con.execute("SELECT v FROM meta WHERE k = 'root'").fetchone()
+            if row is None or row[0] != self.root:
+                # Index belongs to another folder: start over
+                self._con.execute("DELETE FROM dirs")
+                self._con.execute("DELETE FROM files")
+                self._con.execute("INSERT OR REPLACE INTO meta (k, v) VALUES ('root', ?)", (self.root,))
+        self._map: dict[str, dict[str, str]] = self._read_map()
+        self._watcher: threading.Thread | None = None
+
+    def __len__(self) -> int:
+        return len(self._map)
+
+    def get(self, stem: str) -> dict[str, str] | None:
+        return self._map.get(stem.upper())
+
+    def find(self, order_id: str) -> dict[str, str] | None:
+        """First hit among key_variants(order_id)."""
+        m = self._map
+        for key in key_variants(order_id):
+            info = m.get(key)
+            if info:
+                return info
+        return None
+
+    def _read_map(self) -> dict[str, dict[str, str]]:
+        # Same stem in several folders: the last path in sort order wins
+        rows = self._con.execute("SELECT stem, file_name, path FROM files ORDER BY path").fetchall()
+        return {stem: {"file_name": name, "file_path": path} for stem, name, path in rows}
+
+    def refresh(self) -> RefreshStats:
+        """Bring the index up to date with the folder; lists only changed directories."""
+        t0 = time.perf_counter()
+        with self._lock:
+            known = {p: m for p, m in self._con.execute("SELECT path, mtime_ns FROM dirs")}
+            children: dict[str, list[str]] = {}
+            for path, parent in self._con.execute("SELECT path, parent FROM dirs"):
+                children.setdefault(parent, []).append(path)
+
+            seen: set[str] = set()
+            listed = 0
+            stack = [self.root] if os.path.isdir(self.root) else []
+            with self._con:
+                while stack:
+                    d = stack.pop()
+                    try:
+                        mtime = os.stat(d).st_mtime_ns
+                    except OSError:
+                        continue
+                    seen.add(d)
+                    if known.get(d) == mtime:
+                        stack.extend(children.get(d, ()))
+                        continue
+                    try:
+                        entries = list(os.scandir(d))
+                    except OSError:
+                        continue
+                    listed += 1
+                    subdirs, pdfs = [], []
+                    for e in entries:
+                        try:
+                            is_dir = e.is_dir()
+                        except OSError:
+                            is_dir = False
+                        if is_dir:
+                            # like os.walk: symlinked folders are not followed
+                            if not e.is_symlink():
+                                subdirs.append(e.path)
+                        elif e.name.lower().endswith(".pdf"):
+                            pdfs.append((e.path, d, os.path.splitext(e.name)[0].upper(), e.name))
+                    self._con.execute("DELETE FROM files WHERE dir = ?", (d,))
+                    self._con.executemany("INSERT OR REPLACE INTO files VALUES (?, ?, ?, ?)", pdfs)
+                    parent = os.path.dirname(d) if d != self.root else None
+                    self._con.execute("INSERT OR REPLACE INTO dirs VALUES (?, ?, ?)", (d, parent, mtime))
+                    # Subfolders removed from d are dropped below (not seen)
+                    stack.extend(subdirs)
+
+                gone = [p for p in known if p not in seen]
+                for p in gone:
+                    self._con.execute("DELETE FROM dirs WHERE path = ?", (p,))
+                    self._con.execute("DELETE FROM files WHERE dir = ?", (p,))
+
+            changed = bool(listed or gone)
+            if changed:
+                self._map = self._read_map()
+        return RefreshStats(
+            dirs=len(seen), listed=listed, files=len(self._map), changed=changed,
+            seconds=time.perf_counter() - t0,
+        )
+
+    def start_watcher(self, interval: float, on_change=None) -> bool:
+        """Refresh every `interval` seconds on a daemon thread; False if already running."""
+        if self._watcher is not None and self._watcher.is_alive():
+            return False
+
+        def _run():
+            while True:
+                time.sleep(interval)
+                try:
+                    stats = self.refresh()
+                except Exception as e:
+                    print(f"[pdf] index refresh failed: {e}")
+                    continue
+                if stats.changed and on_change is not None:
+                    on_change(stats)
+
+        self._watcher = threading.Thread(target=_run, name="pdf-index-watcher", daemon=True)
+        self._watcher.start()
+        return True
+
+
+__all__ = ["PdfFolderIndex", "RefreshStats", "key_variants"]
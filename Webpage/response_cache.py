@@ -0,0 +1,89 @@
+"""
+Rendered-response cache for read-only pages (see server.cached_response).
+
+Entries are keyed by (path, normalized query args, data generation), so a
+reload never serves stale pages: the new generation simply has different
+keys, and the old entries are cleared when it goes live. The LRU is
+bounded by the total size of the stored bodies rather than an entry count.
+"""
+from __future__ import annotations
+
+import hashlib
+import threading
+from dataclasses import dataclass
+
+from cachetools import LRUCache
+
+# Rough per-entry overhead (key tuple, headers, bookkeeping) added to the body size
+_ENTRY_OVERHEAD = 512
+
+
+@dataclass(frozen=True)
+class CachedResponse:
+    body: bytes
+    status: int
+    headers: tuple[tuple[str, str], ...]
+    etag: str
+
+
+def make_key(path: str, args, generation: tuple) -> tuple:
+    """
+    `generation` starts with (number, loaded_at). Query args are sorted,
+    stripped and empty values dropped (handlers treat those as absent).
+    """
+    norm = tuple(sorted((k, v.strip()) for k, v in args.items(multi=True) if v and v.strip()))
+    return (path, norm, generation)
+
+
+def etag_for(key: tuple) -> str:
+    """Strong validator: generation number + load time + digest of the whole key."""
+    number, loaded_at = key[2][:2]
+    digest = hashlib.sha1(repr(key).encode("utf-8")).hexdigest()[:16]
+    return f"g{number}-{loaded_at:%Y%m%d%H%M%S%f}-{digest}"
+
+
+class ResponseCache:
+    """Thread-safe LRU of CachedResponse limited to `max_bytes`."""
+
+    def __init__(self, max_bytes: int):
+        self.max_bytes = max_bytes
+        self._lru: LRUCache = LRUCache(maxsize=max_bytes, getsizeof=lambda e: len(e.body) + _ENTRY_OVERHEAD)
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key) -> CachedResponse | None:
+        with self._lock:
+            entry = self._lru.get(key)
+            if entry is None:
+                self.misses += 1
+            else:
+                self.hits += 1
+            return entry
+
+    def put(self, key, entry: CachedResponse):
+        if self.max_bytes <= 0:
+            return
+        with self._lock:
+            try:
+                self._lru[key] = entry
+            except ValueError:
+                # Larger than the whole budget: serve it uncached
+                pass
+
+    def clear(self):
+        with self._lock:
+            self._lru.clear()
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "entries": len(self._lru),
+                "bytes": int(self._lru.currsize),
+                "max_bytes": self.max_bytes,
+                "hits": self.hits,
+                "misses": self.misses,
+            }
+
+
+__all__ = ["CachedResponse", "ResponseCache", "etag_for", "make_key"]
@@ -1,12 +1,19 @@
 # server.py
 import os
+import socket
 import sys
-import json
-from datetime import datetime
+import threading
+import time
+import zlib
+from dataclasses import dataclass
+from datetime import date, datetime
+from functools import wraps
 from pathlib import Path
-from flask import Flask, request, render_template_string, jsonify, abort, redirect, url_for, send_file, Response
+from flask import Flask, request, render_template_string, jsonify, abort, redirect, url_for, send_file, Response, has_request_context, make_response
+from flask import g as request_g
+import numpy as np
 import pandas as pd
-from sqlalchemy import text
+from sqlalchemy import inspect, text
 
 from ui import (
     ERR_TPL,
@@ -20,12 +27,33 @@ from quote_ui import QUOTE_TPL
 
 REPO_ROOT = Path(__file__).resolve().parents[1]
 ERP_MODULE_DIR = REPO_ROOT / "ERP_System 2.0"
+# QuickBooks item export; feeds item autocomplete alongside the loaded tables
+ITEM_LISTING_FILE = Path(os.getenv("ITEM_LISTING_FILE") or REPO_ROOT / "Item Listing.CSV")
+# Compact dtypes for the loaded frames (see frame_schema.py); ERP_COMPACT_FRAMES=0 keeps them as read
+COMPACT_FRAMES = os.getenv("ERP_COMPACT_FRAMES", "1") == "1"
 if str(ERP_MODULE_DIR) not in sys.path:
     sys.path.append(str(ERP_MODULE_DIR))
 
-from erp_normalize import normalize_item
-from atp import build_atp_view, earliest_atp_strict
+from erp_normalize import normalize_series
+from atp import build_atp_view, build_atp_index, earliest_atp_from_index, earliest_atp_for_quotes
 from db_config import get_engine, DATABASE_DSN
+from pdf_orders import PDF_ORDER_COLUMNS, load_pdf_orders
+from pdf_log_schema import NEWEST_FOR_KEYS_SQL, has_so_key, so_key_for_query
+from snapshot import current_version, pin_version, read_manifest, read_snapshot, unpin_version
+from pdf_folder_index import PdfFolderIndex
+from run_cache import CACHE_DIR
+from response_cache import CachedResponse, ResponseCache, etag_for, make_key
+from frame_schema import compact_tables
+from indexes import (
+    DescriptionIndex,
+    RowIndex,
+    SoIndex,
+    SuggestIndex,
+    build_description_index,
+    build_lower_item_index,
+    build_so_index,
+    load_item_listing,
+)
 
 app = Flask(__name__)
 
@@ -37,22 +65,166 @@ engine = get_engine()
 # =========================
 # Data cache
 # =========================
-SO_INV: pd.DataFrame | None = None
-NAV: pd.DataFrame | None = None
-OPEN_PO: pd.DataFrame | None = None
-FINAL_SO: pd.DataFrame | None = None
-LEDGER: pd.DataFrame | None = None
-ITEM_ATP: pd.DataFrame | None = None
+class TableLoadError(RuntimeError):
+    """A table, or what is built from it, could not be loaded for a request."""
+
+
+class StaleGenerationError(TableLoadError):
+    """
+    A generation's tables are gone (republished by a newer ETL run, or the
+    snapshot pruned) before one of its parts read them. The request retries
+    on a new generation.
+    """
+
+
+class _LazyPart:
+    """
+    One independently loaded piece of a generation: a dict of attribute
+    values built on first use, once, under a lock. `key` names the table
+    versions it is built from; a reload reuses a loaded part with the same
+    key instead of reading those tables again (None: never reused).
+    """
+
+    def __init__(self, name: str, build, key: tuple | None):
+        self.name = name
+        self.key = key
+        self._build = build
+        self._lock = threading.Lock()
+        self._values: dict | None = None
+
+    @property
+    def loaded(self) -> bool:
+        return self._values is not None
+
+    def get(self) -> dict:
+        if self._values is None:
+            with self._lock:
+                if self._values is None:
+                    t0 = time.perf_counter()
+                    try:
+                        values = self._build()
+                    except Exception as e:
+                        print(f"[load] {self.name} failed: {e}")
+                        if isinstance(e, TableLoadError):
+                            raise
+                        raise TableLoadError(f"Could not load {self.name}: {e}") from e
+                    self._values, self._build = values, None
+                    print(f"[load] {self.name} ready in {time.perf_counter() - t0:.2f}s")
+        return self._values
+
+
+# DataGeneration attribute -> the part that loads it
+_PART_OF = {
+    # wo_structured; SoIndex: row positions by item / SO / customer
+    "so_inv": "so",
+    "so_index": "so",
+    # NT Shipping Schedule; RowIndex over str(Item).lower(), DescriptionIndex over "Description"
+    "nav": "nav",
+    "nav_item_index": "nav",
+    "nav_desc_index": "nav",
+    # Open_Purchase_Orders; same indexes over its item / description columns
+    "open_po": "open_po",
+    "open_po_item_index": "open_po",
+    "open_po_desc_index": "open_po",
+    # ledger_analytics + item_atp; atp_index: item -> (sorted dates, FutureMin_NAV),
+    # ledger_item_index: RowIndex over str(ledger Item)
+    "ledger": "atp",
+    "item_atp": "atp",
+    "atp_index": "atp",
+    "ledger_item_index": "atp",
+    # open_sales_orders ordered like the PDF orders in pdf_file_log
+    "final_so": "final_so",
+    # SuggestIndex for /api/item_suggest
+    "suggest_index": "suggest",
+    # OverviewPayloads; None unless ERP_PRECOMPUTE_OVERVIEW
+    "overview": "overview",
+}
+
+
+@dataclass(frozen=True)
+class DataGeneration:
+    """
+    One immutable set of tables plus everything derived from them. A reload
+    builds a new generation off to the side and swaps it in with a single
+    assignment; requests keep the generation they started with.
+
+    Tables are read lazily: the attributes in _PART_OF (data.so_inv,
+    data.atp_index, ...) load their part on first access, so a request only
+    waits for the tables it uses. Frames are shared between requests: copy
+    before modifying.
+    """
+    number: int
+    parts: dict                      # part name -> _LazyPart
+    loaded_at: datetime
+    source: str                      # "snapshot" or "db"
+    source_version: str | None       # what the poller compares against
+    snapshot: str | None = None      # snapshot version read (source == "snapshot")
+
+    def __getattr__(self, name):
+        part = _PART_OF.get(name)
+        if part is None:
+            raise AttributeError(name)
+        if part not in self.parts:
+            return None
+        return self.parts[part].get()[name]
+
+    def loaded_parts(self) -> list[str]:
+        return [name for name, part in self.parts.items() if part.loaded]
+
+
+class _GenerationStore:
+    """Current generation plus a per-generation count of requests still using it."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._refs: dict[int, int] = {}
+        self.current: DataGeneration | None = None
+
+    def acquire(self) -> DataGeneration | None:
+        with self._lock:
+            gen = self.current
+            if gen is not None:
+                self._refs[gen.number] = self._refs.get(gen.number, 0) + 1
+            return gen
+
+    def release(self, gen: DataGeneration | None):
+        if gen is None:
+            return
+        with self._lock:
+            left = self._refs.get(gen.number, 0) - 1
+            if left > 0:
+                self._refs[gen.number] = left
+                return
+            self._refs.pop(gen.number, None)
+            if gen is not self.current:
+                print(f"[load] generation {gen.number} drained")
+
+    def swap(self, gen: DataGeneration) -> DataGeneration | None:
+        with self._lock:
+            old, self.current = self.current, gen
+            return old
+
+    def in_flight(self) -> dict[int, int]:
+        with self._lock:
+            return dict(self._refs)
+
+
+_GENERATIONS = _GenerationStore()
+_RELOAD_LOCK = threading.Lock()
+_RELOAD_THREAD_LOCK = threading.Lock()
+_RELOAD_THREAD: threading.Thread | None = None
 _LAST_LOAD_ERR: str | None = None
-_LAST_LOADED_AT: datetime | None = None
 
 # =========================
 # PDF settings/cache
 # =========================
 # Configure a root folder that contains PDF files named by order id (e.g. SO-12345.pdf)
 PDF_FOLDER = os.getenv("PDF_FOLDER", "")
-# Map of order_id (stem of filename) -> {file_name, file_path}
-PDF_MAP: dict[str, dict[str, str]] = {}
+# Persistent stem -> path index of PDF_FOLDER (refreshed incrementally)
+PDF_INDEX_DB = Path(os.getenv("PDF_INDEX_DB") or CACHE_DIR / "pdf_folder_index.sqlite")
+PDF_INDEX_POLL_SECONDS = float(os.getenv("PDF_INDEX_POLL_SECONDS", "60"))
+PDF_INDEX: PdfFolderIndex | None = None
+_PDF_INDEX_LOCK = threading.Lock()
 
 TABLE_HEADER_LABELS = {
     "Item": "Item",
@@ -80,9 +252,83 @@ def _to_date_str(s: pd.Series, fmt="%Y-%m-%d") -> pd.Series:
     s = pd.to_datetime(s, errors="coerce")
     return s.apply(lambda x: x.strftime(fmt) if pd.notnull(x) else "")
 
-def _read_table(schema: str, table: str) -> pd.DataFrame:
-    sql = f'SELECT * FROM "{schema}"."{table}"'
-    return pd.read_sql_query(text(sql), con=engine)
+def _quote_ident(name: str) -> str:
+    return '"' + name.replace('"', '""') + '"'
+
+def _read_table(schema: str, table: str, columns=None, con=None) -> pd.DataFrame:
+    """`columns` (in table order) of a table, or all of them when None / none exist."""
+    con = con if con is not None else engine
+    selected = "*"
+    if columns is not None:
+        wanted = set(columns)
+        present = [c["name"] for c in inspect(con).get_columns(table, schema=schema) if c["name"] in wanted]
+        if present:
+            selected = ", ".join(_quote_ident(c) for c in present)
+    sql = f"SELECT {selected} FROM {_quote_ident(schema)}.{_quote_ident(table)}"
+    return pd.read_sql_query(text(sql), con=con)
+
+
+# ETL-published tables read by the server, with the columns the routes use
+# from each (None: all of them; NAV and open-PO lookups show every column).
+# Columns a table lacks are skipped; the handlers already allow for that.
+TABLE_COLUMNS: dict[str, tuple[str, ...] | None] = {
+    "wo_structured": (
+        "Order Date", "Name", "P. O. #", "QB Num", "Item", "Qty(-)", "Available",
+        "Available + On PO", "Available + Pre-installed PO", "On Hand", "On Sales Order",
+        "On Sales", "On SO", "On PO", "Assigned Q'ty", "On Hand - WIP", "In Stock(Inventory)",
+        "Sales/Week", "Recommended Restock Qty", "Component_Status", "Ship Date", "Picked",
+    ),
+    "NT Shipping Schedule": None,
+    "Open_Purchase_Orders": None,
+    "ledger_analytics": (
+        "Date", "Item", "Kind", "Source", "Delta", "Opening", "Projected_NAV",
+        "NAV_before", "NAV_after", "QB Num", "P. O. #", "Name",
+    ),
+    "item_atp": ("Item", "Date", "Projected_NAV", "FutureMin_NAV"),
+    "open_sales_orders": (
+        "Order Date", "Name", "P. O. #", "QB Num", "Item", "Qty(-)", "Ship Date",
+        "WO", "WO_Number", "NTA Order ID", "SO Number",
+    ),
+}
+PUBLISHED_TABLES = tuple(TABLE_COLUMNS)
+OPTIONAL_TABLES = {"item_atp", "open_sales_orders"}
+
+# Local Arrow snapshot written by etl.py after each publish (snapshot module).
+# Preferred over Postgres when present; set ERP_USE_SNAPSHOT=0 to always use the DB.
+USE_SNAPSHOT = os.getenv("ERP_USE_SNAPSHOT", "1") != "0"
+
+def _db_table_oids(schema: str = "public", tables=PUBLISHED_TABLES, conn=None) -> dict[str, int | None]:
+    """
+    Table OIDs of the published tables (None: missing). publish_tables
+    replaces every table (DROP + RENAME), so the OIDs change exactly when an
+    ETL run commits.
+    """
+    names = sorted(tables)
+    params = {f"t{i}": f'"{schema}"."{t}"' for i, t in enumerate(names)}
+    cols = ", ".join(f"to_regclass(:t{i})::oid" for i in range(len(names)))
+    if conn is not None:
+        row = conn.execute(text(f"SELECT {cols}"), params).one()
+    else:
+        with engine.connect() as conn:
+            row = conn.execute(text(f"SELECT {cols}"), params).one()
+    return dict(zip(names, row))
+
+def _db_version(oids: dict[str, int | None]) -> str:
+    return "db:" + ",".join(str(oids[t]) for t in sorted(oids))
+
+def _db_tables_version(schema: str = "public") -> str | None:
+    try:
+        return _db_version(_db_table_oids(schema))
+    except Exception:
+        return None
+
+def _source_version() -> str | None:
+    """Version of the data a reload would read right now."""
+    if USE_SNAPSHOT:
+        version = current_version()
+        if version:
+            return f"snapshot:{version}"
+    return _db_tables_version()
 
 
 def _reorder_df_out_by_output(output_df: pd.DataFrame, df_out: pd.DataFrame) -> pd.DataFrame:
@@ -116,50 +362,21 @@ def _reorder_df_out_by_output(output_df: pd.DataFrame, df_out: pd.DataFrame) ->
 def _build_pdf_orders_df() -> pd.DataFrame:
     """
     Build ['WO','Product Number'] from public.pdf_file_log.extracted_data JSON.
-    Mirrors io_ops.fetch_pdf_orders_df_from_supabase but kept local to avoid extra deps.
+    Same source as io_ops.fetch_pdf_orders_df_from_supabase (pdf_orders module):
+    flattened in Postgres, and only rows added since the last load are fetched.
     """
     try:
-        rows = pd.read_sql('SELECT order_id, extracted_data FROM public.pdf_file_log', engine)
+        return load_pdf_orders(engine)
     except Exception:
-        return pd.DataFrame(columns=["WO", "Product Number"])
-
-    def rows_from_json(extracted_data, order_id=""):
-        if isinstance(extracted_data, str):
-            try:
-                extracted_data = json.loads(extracted_data)
-            except Exception:
-                extracted_data = {}
-        data = extracted_data or {}
-        wo = data.get("wo", order_id)
-        items = data.get("items") or []
-        if not items:
-            return [{"WO": wo, "Product Number": ""}]
-        out = []
-        for it in items:
-            pn = (
-                it.get("product_number")
-                or it.get("part_number")
-                or it.get("product")
-                or it.get("part")
-                or ""
-            )
-            out.append({"WO": wo, "Product Number": pn})
-        return out
+        return pd.DataFrame(columns=PDF_ORDER_COLUMNS)
 
-    all_rows = []
-    for _, r in rows.iterrows():
-        all_rows.extend(rows_from_json(r.get("extracted_data"), r.get("order_id")))
-    return pd.DataFrame(all_rows, columns=["WO", "Product Number"])
 
-
-def _build_final_sales_order_from_db() -> pd.DataFrame:
+def _build_final_sales_order_from_db(df_sales_order: pd.DataFrame | None) -> pd.DataFrame:
     """
     Rebuild final_sales_order from DB tables so it can be used
     for the Production Planning calendar.
     """
-    try:
-        df_sales_order = _read_table("public", "open_sales_orders")
-    except Exception:
+    if df_sales_order is None:
         return pd.DataFrame()
 
     pdf_orders_df = _build_pdf_orders_df()
@@ -192,26 +409,54 @@ def _build_final_sales_order_from_db() -> pd.DataFrame:
     pdf_ref = pdf_orders_df.rename(columns={"WO": "QB Num", "Product Number": "Item"})
     final_sales_order = _reorder_df_out_by_output(pdf_ref, df_out)
 
-    final_sales_order["Item"] = final_sales_order["Item"].map(normalize_item)
+    final_sales_order["Item"] = normalize_series(final_sales_order["Item"])
     final_sales_order = final_sales_order.loc[:, ~final_sales_order.columns.duplicated()]
 
     return final_sales_order
 
 # ---------- PDF DB helpers (no Flask-SQLAlchemy) ----------
+_PDF_LOG_HAS_SO_KEY: bool | None = None
+
+def _pdf_log_has_so_key() -> bool:
+    """Whether pdf_log_schema's so_key column exists (checked once per data load)."""
+    global _PDF_LOG_HAS_SO_KEY
+    if _PDF_LOG_HAS_SO_KEY is None:
+        try:
+            with engine.connect() as conn:
+                _PDF_LOG_HAS_SO_KEY = has_so_key(conn)
+        except Exception:
+            return False
+    return _PDF_LOG_HAS_SO_KEY
+
+def _reset_pdf_log_schema():
+    global _PDF_LOG_HAS_SO_KEY
+    _PDF_LOG_HAS_SO_KEY = None
+
 def _pdf_db_search_by_filename(search_query: str, limit: int = 10) -> list[dict]:
     """Search pdf_file_log by file_name ILIKE %search_query% using SQLAlchemy Core.
+    A query that is just an SO number also matches rows whose indexed so_key
+    column (when migrated) has that number, e.g. "SO 20250975.pdf" for
+    "SO-20250975"; so_key only holds a file name's first SO number, so the
+    ILIKE hits are always included.
     Returns list of dict rows; empty if table missing or error.
     """
     if not search_query:
         return []
+    so_key = so_key_for_query(search_query) if _pdf_log_has_so_key() else None
     try:
-        sql = text(
-            'SELECT id, order_id, file_name, file_path, extracted_data '
-            'FROM "public"."pdf_file_log" WHERE file_name ILIKE :q '
-            'ORDER BY id DESC LIMIT :lim'
-        )
         with engine.connect() as conn:
-            res = conn.execute(sql, {"q": f"%{search_query}%", "lim": limit})
+            params = {"q": f"%{search_query}%", "lim": limit}
+            where = "file_name ILIKE :q"
+            if so_key:
+                # Both sides are indexed (btree / trigram): a BitmapOr, not a scan
+                where = "so_key = :k OR file_name ILIKE :q"
+                params["k"] = so_key
+            sql = text(
+                'SELECT id, order_id, file_name, file_path, extracted_data '
+                f'FROM "public"."pdf_file_log" WHERE {where} '
+                'ORDER BY id DESC LIMIT :lim'
+            )
+            res = conn.execute(sql, params)
             return [dict(row) for row in res.mappings().all()]
     except Exception:
         # Table might not exist, or permissions issues; return empty silently
@@ -237,100 +482,511 @@ def _validate_paths(paths: list[str]):
         else:
             print(f"[pdf] Valid path: {p}")
 
-def _scan_pdf_folder(folder_path: str) -> dict[str, dict[str, str]]:
-    data: dict[str, dict[str, str]] = {}
-    if not folder_path:
-        return data
-    if not os.path.isdir(folder_path):
-        print(f"[pdf] PDF_FOLDER is not a directory: {folder_path}")
-        return data
-    for root, _dirs, files in os.walk(folder_path):
-        for name in files:
-            if name.lower().endswith(".pdf"):
-                path = os.path.join(root, name)
-                order_id = os.path.splitext(name)[0]
-                data[order_id.upper()] = {"file_name": name, "file_path": path}
-    print(f"[pdf] scanned {len(data)} PDF(s) under {folder_path}")
-    return data
+def _open_pdf_index() -> PdfFolderIndex | None:
+    global PDF_INDEX
+    if PDF_INDEX is None and PDF_FOLDER:
+        with _PDF_INDEX_LOCK:
+            if PDF_INDEX is None:
+                if not os.path.isdir(PDF_FOLDER):
+                    print(f"[pdf] PDF_FOLDER is not a directory: {PDF_FOLDER}")
+                index = PdfFolderIndex(PDF_FOLDER, PDF_INDEX_DB)
+                _refresh_pdf_index(index)
+                PDF_INDEX = index
+    return PDF_INDEX
+
+def _refresh_pdf_index(index: PdfFolderIndex):
+    stats = index.refresh()
+    print(
+        f"[pdf] {stats.files} PDF(s) under {PDF_FOLDER}: listed {stats.listed} of "
+        f"{stats.dirs} folder(s) in {stats.seconds:.2f}s"
+    )
 
 def _load_pdf_map(force: bool = False):
-    global PDF_MAP
-    if PDF_MAP and not force:
-        return
-    if PDF_FOLDER:
-        _validate_paths([PDF_FOLDER])
-        PDF_MAP = _scan_pdf_folder(PDF_FOLDER)
-    else:
-        PDF_MAP = {}
+    """Open the PDF folder index on first use; force=True re-checks changed folders."""
+    if PDF_INDEX is None:
+        if PDF_FOLDER:
+            _validate_paths([PDF_FOLDER])
+        _open_pdf_index()
+    elif force:
+        _refresh_pdf_index(PDF_INDEX)
+
+def _pdf_folder_find(order_id: str) -> dict[str, str] | None:
+    """{file_name, file_path} for an order id, trying the SO-/numeric variants."""
+    index = _open_pdf_index()
+    return index.find(order_id) if index is not None else None
+
+def start_pdf_watcher(interval: float | None = None) -> bool:
+    """Keep the PDF folder index fresh from a daemon thread (no-op without PDF_FOLDER)."""
+    index = _open_pdf_index()
+    if index is None:
+        return False
+    interval = PDF_INDEX_POLL_SECONDS if interval is None else interval
+    return index.start_watcher(interval, on_change=lambda st: print(f"[pdf] folder changed: {st.files} PDF(s)"))
+
+DUMMY_DATES = {pd.Timestamp("2099-07-04"), pd.Timestamp("2099-12-31")}
+
+def _build_atp_index(ledger: pd.DataFrame, item_atp: pd.DataFrame) -> dict:
+    """
+    Build the per-item ATP index used by quotation lookups.
 
-def _load_from_db(force: bool = False):
-    global SO_INV, NAV, OPEN_PO, FINAL_SO, LEDGER, ITEM_ATP, _LAST_LOAD_ERR, _LAST_LOADED_AT
+    Preferred source: ledger_analytics with placeholder dates excluded.
+    Fallback: the precomputed item_atp table when the ledger is empty.
+    """
+    if ledger is not None and not ledger.empty:
+        df_ledger = ledger
+        if "Date" in df_ledger.columns:
+            dates = pd.to_datetime(df_ledger["Date"], errors="coerce")
+            df_ledger = df_ledger.loc[~dates.isin(DUMMY_DATES)]
+        return build_atp_index(build_atp_view(df_ledger))
+    if item_atp is not None and not item_atp.empty:
+        return build_atp_index(item_atp)
+    return {}
+
+def _categoricals_as_read_sql(df: pd.DataFrame) -> pd.DataFrame:
+    """
+    Snapshot categoricals as the plain values the DB path returns. The ETL's
+    are ordered by meaning (ledger Kind: OPEN < IN < ADJ < OUT), which would
+    sort rows differently from the strings read_sql gives.
+    """
+    for i in range(df.shape[1]):
+        col = df.iloc[:, i]
+        if isinstance(col.dtype, pd.CategoricalDtype):
+            df.isetitem(i, col.astype(object).where(col.notna(), None))
+    return df
+
+@dataclass(frozen=True)
+class _TableSource:
+    """Where a generation's tables are read from, and the version of each."""
+    kind: str                        # "snapshot" or "db"
+    snapshot: str | None             # snapshot version (kind == "snapshot")
+    versions: dict                   # table -> version; None if not published
+
+    def read(self, *tables: str) -> dict[str, pd.DataFrame | None]:
+        """
+        TABLE_COLUMNS of each table (None if it is not published), all at the
+        versions in `versions`; StaleGenerationError if those are gone.
+        """
+        frames = dict.fromkeys(tables)
+        # In the order publish_tables swaps (and locks) them, so neither waits on the other
+        wanted = sorted(t for t in tables if self.versions.get(t) is not None)
+        if self.kind == "snapshot":
+            for table in wanted:
+                frames[table] = self._timed(table, self._read_snapshot, table)
+            return frames
+        # One transaction: each read holds its table's lock until the OIDs are checked
+        with engine.connect().execution_options(isolation_level="REPEATABLE READ") as conn:
+            for table in wanted:
+                frames[table] = self._timed(table, _read_table, "public", table, TABLE_COLUMNS[table], conn)
+            oids = _db_table_oids("public", wanted, conn)
+        stale = [t for t in wanted if str(oids[t]) != self.versions[t]]
+        if stale:
+            raise StaleGenerationError(f"{', '.join(stale)} republished since generation was created")
+        return frames
+
+    def _read_snapshot(self, table: str) -> pd.DataFrame:
+        columns = TABLE_COLUMNS[table]
+        try:
+            snap = read_snapshot([table], version=self.snapshot, columns={table: columns} if columns else None)
+        except FileNotFoundError as e:
+            raise StaleGenerationError(f"snapshot {self.snapshot} was removed: {e}") from e
+        return _categoricals_as_read_sql(snap[1][table])
+
+    def _timed(self, table: str, read, *args) -> pd.DataFrame:
+        t0 = time.perf_counter()
+        df = read(*args)
+        print(f"[load] {table}: {len(df)} rows x {df.shape[1]} columns from {self.kind} in {time.perf_counter() - t0:.2f}s")
+        return df
+
+
+def _snapshot_table_version(version: str, entry: dict | None) -> str | None:
+    if entry is None:
+        return None
+    # Snapshots written before per-table digests: a new version changes every table
+    return f"sha1:{entry['sha1']}" if "sha1" in entry else f"{version}/{entry['file']}"
+
+def _current_source() -> tuple[_TableSource, str]:
+    """
+    (source, source_version) a new generation would read. A table's version
+    changes whenever its content may have: the file sha1 for snapshots,
+    the OID in the DB.
+    """
+    if USE_SNAPSHOT:
+        try:
+            manifest = read_manifest()
+        except Exception as e:
+            print(f"[load] snapshot unreadable, using DB: {e}")
+            manifest = None
+        if manifest is not None:
+            version, entries = manifest["version"], manifest["tables"]
+            missing = [t for t in PUBLISHED_TABLES if t not in entries and t not in OPTIONAL_TABLES]
+            if not missing:
+                versions = {t: _snapshot_table_version(version, entries.get(t)) for t in PUBLISHED_TABLES}
+                return _TableSource("snapshot", version, versions), f"snapshot:{version}"
+            print(f"[load] snapshot {version} lacks {missing}, using DB")
+    oids = _db_table_oids("public")
+    missing = [t for t in PUBLISHED_TABLES if oids[t] is None and t not in OPTIONAL_TABLES]
+    if missing:
+        raise RuntimeError(f"tables not found in the database: {missing}")
+    versions = {t: str(oids[t]) if oids[t] is not None else None for t in PUBLISHED_TABLES}
+    return _TableSource("db", None, versions), _db_version(oids)
+
+
+def _compact_part(name: str, frames: dict[str, pd.DataFrame]):
+    """compact_tables on a part's frames; callers hold no other reference to them."""
+    if COMPACT_FRAMES:
+        stats = compact_tables(frames)
+        print(f"[load] {name} compact dtypes: {stats.describe()}")
+
+def _load_so_part(src: _TableSource) -> dict:
+    frames = {"so": src.read("wo_structured")["wo_structured"]}
+    if src.kind == "db":
+        # SQL round trip loses dtypes; snapshots keep the ETL's datetimes
+        for c in ("Ship Date", "Order Date"):
+            _safe_date_col(frames["so"], c)
+    _compact_part("so", frames)
+    so = frames["so"]
+    return {"so_inv": so, "so_index": build_so_index(so)}
+
+def _load_nav_part(src: _TableSource) -> dict:
+    frames = {"nav": src.read("NT Shipping Schedule")["NT Shipping Schedule"]}
+    if src.kind == "db":
+        for c in ("Ship Date", "Order Date"):
+            _safe_date_col(frames["nav"], c)
+    _compact_part("nav", frames)
+    nav = frames["nav"]
+    return {
+        "nav": nav,
+        "nav_item_index": RowIndex(nav["Item"].astype(str).str.lower()) if "Item" in nav.columns else None,
+        "nav_desc_index": build_description_index(nav, "Description"),
+    }
+
+def _load_open_po_part(src: _TableSource) -> dict:
+    frames = {"open_po": src.read("Open_Purchase_Orders")["Open_Purchase_Orders"]}
+    if src.kind == "db":
+        for col in frames["open_po"].columns:
+            if "date" in col.lower():
+                _safe_date_col(frames["open_po"], col)
+    _compact_part("open_po", frames)
+    open_po = frames["open_po"]
+    return {
+        "open_po": open_po,
+        "open_po_item_index": build_lower_item_index(open_po),
+        "open_po_desc_index": build_description_index(open_po),
+    }
+
+def _load_atp_part(src: _TableSource) -> dict:
+    tables = src.read("ledger_analytics", "item_atp")
+    ledger = tables.pop("ledger_analytics")
+    # item_atp is optional; if missing, fall back to empty frame
+    item_atp = tables.pop("item_atp")
+    if item_atp is None:
+        item_atp = pd.DataFrame(columns=["Item", "Date", "Projected_NAV", "FutureMin_NAV"])
+    if src.kind == "db" and "Date" in ledger.columns:
+        _safe_date_col(ledger, "Date")
+    # Built from the frames as read; the part keeps the compacted ones
+    atp_index = _build_atp_index(ledger, item_atp)
+    frames = {"ledger": ledger, "item_atp": item_atp}
+    del ledger, item_atp
+    _compact_part("atp", frames)
+    ledger = frames["ledger"]
+    return {
+        "ledger": ledger,
+        "item_atp": frames["item_atp"],
+        "atp_index": atp_index,
+        "ledger_item_index": RowIndex(ledger["Item"].astype(str)) if "Item" in ledger.columns else None,
+    }
+
+def _load_final_so_part(src: _TableSource) -> dict:
+    frames = {"final_so": _build_final_sales_order_from_db(src.read("open_sales_orders")["open_sales_orders"])}
+    _compact_part("final_so", frames)
+    return {"final_so": frames["final_so"]}
+
+def _item_listing_version() -> int | None:
     try:
-        if (
-            force
-            or SO_INV is None
-            or NAV is None
-            or OPEN_PO is None
-            or FINAL_SO is None
-            or LEDGER is None
-            or ITEM_ATP is None
-        ):
-            so = _read_table("public", "wo_structured")
-            nav = _read_table("public", "NT Shipping Schedule")
-            open_po = _read_table("public", "Open_Purchase_Orders")
-            ledger = _read_table("public", "ledger_analytics")
-            # item_atp is optional; if missing, fall back to empty frame
-            try:
-                item_atp = _read_table("public", "item_atp")
-            except Exception:
-                item_atp = pd.DataFrame(columns=["Item", "Date", "Projected_NAV", "FutureMin_NAV"])
-
-            for c in ("Ship Date", "Order Date"):
-                _safe_date_col(so, c)
-                _safe_date_col(nav, c)
-            for col in open_po.columns:
-                if "date" in col.lower():
-                    _safe_date_col(open_po, col)
-            if "Date" in ledger.columns:
-                _safe_date_col(ledger, "Date")
-
-            SO_INV, NAV, OPEN_PO = so, nav, open_po
-            FINAL_SO = _build_final_sales_order_from_db()
-            LEDGER = ledger
-            ITEM_ATP = item_atp
-            _LAST_LOAD_ERR = None
-            _LAST_LOADED_AT = datetime.now()
-    except Exception as e:
-        SO_INV = None
-        NAV = None
-        OPEN_PO = None
-        FINAL_SO = None
-        LEDGER = None
-        ITEM_ATP = None
-        _LAST_LOAD_ERR = f"DB load error: {e}"
-
-def _ensure_loaded():
-    if (
-        SO_INV is None
-        or NAV is None
-        or OPEN_PO is None
-        or FINAL_SO is None
-        or LEDGER is None
-        or ITEM_ATP is None
-    ):
+        return ITEM_LISTING_FILE.stat().st_mtime_ns
+    except OSError:
+        return None
+
+def _new_generation(number: int, previous: DataGeneration | None) -> DataGeneration:
+    """
+    A generation over the tables as published right now; nothing is read
+    yet. Loaded parts of `previous` whose tables have the same versions are
+    shared instead of read again. Touches no globals.
+    """
+    src, source_version = _current_source()
+    parts: dict[str, _LazyPart] = {}
+
+    def add(name: str, build, key: tuple | None):
+        old = previous.parts.get(name) if previous is not None else None
+        if key is not None and old is not None and old.loaded and old.key == key:
+            parts[name] = old
+        else:
+            parts[name] = _LazyPart(name, build, key)
+
+    def table_key(*tables: str) -> tuple:
+        return (src.kind, *(src.versions[t] for t in tables))
+
+    def value(part: str, attr: str):
+        return parts[part].get()[attr]
+
+    add("so", lambda: _load_so_part(src), table_key("wo_structured"))
+    add("nav", lambda: _load_nav_part(src), table_key("NT Shipping Schedule"))
+    add("open_po", lambda: _load_open_po_part(src), table_key("Open_Purchase_Orders"))
+    add("atp", lambda: _load_atp_part(src), table_key("ledger_analytics", "item_atp"))
+    # Also reads pdf_file_log, which has no version: rebuilt by every reload
+    add("final_so", lambda: _load_final_so_part(src), None)
+    tables_key = table_key("wo_structured", "NT Shipping Schedule", "Open_Purchase_Orders")
+    add(
+        "suggest",
+        lambda: {"suggest_index": _build_suggest_index(value("so", "so_inv"), value("nav", "nav"), value("open_po", "open_po"))},
+        (*tables_key, _item_listing_version()),
+    )
+    if PRECOMPUTE_OVERVIEW:
+        add(
+            "overview",
+            lambda: {"overview": _build_overview_payloads(
+                value("so", "so_inv"), value("nav", "nav"), value("open_po", "open_po"),
+                value("so", "so_index"), value("nav", "nav_item_index"), value("open_po", "open_po_item_index"),
+                value("nav", "nav_desc_index"), value("open_po", "open_po_desc_index"),
+            )},
+            tables_key,
+        )
+    return DataGeneration(
+        number=number,
+        parts=parts,
+        loaded_at=datetime.now(),
+        source=src.kind,
+        source_version=source_version,
+        snapshot=src.snapshot,
+    )
+
+def _build_suggest_index(so: pd.DataFrame, nav: pd.DataFrame, open_po: pd.DataFrame) -> SuggestIndex:
+    """All known part names: loaded tables plus the QuickBooks item listing (mapped to NAV names)."""
+    names = [df["Item"].astype(str) for df in (so, nav, open_po) if "Item" in df.columns]
+    listing = load_item_listing(ITEM_LISTING_FILE)
+    if listing:
+        names.append(normalize_series(pd.Series(listing, dtype=object)))
+    return SuggestIndex(pd.concat(names, ignore_index=True) if names else [])
+
+def _load_from_db(force: bool = False) -> bool:
+    """
+    Start a new data generation and swap it in. Parts whose tables did not
+    change are carried over; the other parts the current generation had
+    loaded are loaded first, so pages never wait on a reload. Everything
+    else loads on first use. On failure the current generation keeps
+    serving and the error is kept in _LAST_LOAD_ERR. Concurrent calls are
+    serialized; returns True if data is available.
+    """
+    global _LAST_LOAD_ERR
+    with _RELOAD_LOCK:
+        current = _GENERATIONS.current
+        if current is not None and not force:
+            return True
+        number = current.number + 1 if current is not None else 1
+        try:
+            gen = _new_generation(number, current)
+            reused = [name for name, part in gen.parts.items() if current is not None and part is current.parts.get(name)]
+            for name in current.loaded_parts() if current is not None else []:
+                if name in gen.parts:
+                    gen.parts[name].get()
+        except Exception as e:
+            _LAST_LOAD_ERR = f"DB load error: {e}"
+            print(f"[load] reload failed, keeping generation {current.number if current else None}: {e}")
+            return current is not None
+        _GENERATIONS.swap(gen)
+        _pin_snapshot(gen, current)
+        _LAST_LOAD_ERR = None
+        _reset_pdf_log_schema()
+        RESPONSE_CACHE.clear()
+        print(
+            f"[load] generation {gen.number} live ({gen.source}, {gen.source_version}; "
+            f"loaded: {', '.join(gen.loaded_parts()) or 'none'}; reused: {', '.join(reused) or 'none'})"
+        )
+        return True
+
+def _pin_snapshot(gen: DataGeneration | None, previous: DataGeneration | None = None):
+    """
+    Pin the snapshot version the live generation reads, so the ETL's pruning
+    keeps it while parts still load from it (refreshed by the poller), and
+    drop this process's pin on the one it replaced.
+    """
+    owner = f"{socket.gethostname()}-{os.getpid()}"
+    if previous is not None and previous.snapshot and previous.snapshot != (gen.snapshot if gen else None):
+        unpin_version(previous.snapshot, owner)
+    if gen is not None and gen.snapshot and not pin_version(gen.snapshot, owner):
+        print(f"[load] could not pin snapshot {gen.snapshot}")
+
+def preload(names=None):
+    """
+    Load parts of the live generation now instead of on first use (all of
+    them by default), e.g. before a pre-forking server forks its workers.
+    """
+    gen = _GENERATIONS.current
+    if gen is None:
+        return
+    for name in gen.parts if names is None else names:
+        if name in gen.parts:
+            gen.parts[name].get()
+
+def reload_in_background() -> bool:
+    """Start a forced reload on a worker thread; False if one is already running."""
+    global _RELOAD_THREAD
+    with _RELOAD_THREAD_LOCK:
+        if _RELOAD_THREAD is not None and _RELOAD_THREAD.is_alive():
+            return False
+        _RELOAD_THREAD = threading.Thread(target=_load_from_db, kwargs={"force": True}, name="erp-reload", daemon=True)
+        _RELOAD_THREAD.start()
+        return True
+
+def _poll_for_new_data(interval: float):
+    while True:
+        time.sleep(interval)
+        try:
+            current = _GENERATIONS.current
+            _pin_snapshot(current)
+            version = _source_version()
+            if version and (current is None or version != current.source_version):
+                print(f"[load] new data detected ({version}), reloading")
+                _load_from_db(force=True)
+        except Exception as e:
+            print(f"[load] poll failed: {e}")
+
+_POLLER: threading.Thread | None = None
+
+def start_reload_poller(interval: float | None = None) -> threading.Thread | None:
+    """
+    Watch for finished ETL runs (new snapshot, or new table OIDs in the DB)
+    and reload in the background. Interval from ERP_RELOAD_POLL_SECONDS
+    (default 30s; 0 disables). Safe to call more than once per process.
+    """
+    global _POLLER
+    if interval is None:
+        interval = float(os.getenv("ERP_RELOAD_POLL_SECONDS", "30"))
+    if interval <= 0:
+        return None
+    if _POLLER is None or not _POLLER.is_alive():
+        _POLLER = threading.Thread(target=_poll_for_new_data, args=(interval,), name="erp-reload-poll", daemon=True)
+        _POLLER.start()
+    return _POLLER
+
+def start_background_tasks():
+    """Reload poller + PDF folder watcher. Threads do not survive fork: call in each serving process."""
+    start_reload_poller()
+    start_pdf_watcher()
+
+def after_fork():
+    """
+    Per-worker setup for pre-forking servers (gunicorn post_fork). The loaded
+    generation is inherited copy-on-write; connections are not shareable, so
+    the pool and the PDF index handle are dropped and reopened on first use.
+    """
+    global PDF_INDEX
+    engine.dispose(close=False)
+    PDF_INDEX = None
+    _pin_snapshot(_GENERATIONS.current)
+    start_background_tasks()
+
+def _data() -> DataGeneration | None:
+    """
+    The generation this request works on. The first call in a request pins
+    the live generation (released in teardown), so a reload mid-request does
+    not mix two datasets. Outside a request, the live generation.
+    """
+    if not has_request_context():
+        return _GENERATIONS.current
+    if request_g.get("data") is None:
+        request_g.data = _GENERATIONS.acquire()
+    return request_g.data
+
+def _repin() -> DataGeneration | None:
+    """Drop this request's pinned generation and pin the live one (after a reload)."""
+    if has_request_context():
+        _GENERATIONS.release(request_g.pop("data", None))
+    return _data()
+
+@app.teardown_request
+def _release_generation(exc=None):
+    _GENERATIONS.release(request_g.pop("data", None))
+
+def _load_error() -> str:
+    return _LAST_LOAD_ERR or "Data is not loaded yet."
+
+def _retry_on_new_generation():
+    """Run this request's view again on a generation over the tables as published now."""
+    if _GENERATIONS.current is _data():
         _load_from_db(force=True)
+    _repin()
+    return make_response(app.view_functions[request.endpoint](**(request.view_args or {})))
+
+@app.errorhandler(TableLoadError)
+def _table_load_error(e):
+    if isinstance(e, StaleGenerationError) and not request_g.get("stale_retry"):
+        print(f"[load] {e}; retrying on a new generation")
+        request_g.stale_retry = True
+        try:
+            return _retry_on_new_generation()
+        except TableLoadError as retry_error:
+            e = retry_error
+    # A part failed to load mid-request; the next request tries again
+    if request.path.startswith("/api/"):
+        return jsonify({"ok": False, "error": str(e)}), 503
+    return render_template_string(ERR_TPL, error=str(e)), 503
+
+def _ensure_loaded() -> DataGeneration | None:
+    if _data() is None:
+        _load_from_db(force=True)
+        _repin()
     # Load PDF map on demand as well
     _load_pdf_map()
+    return _data()
+
+# Rendered item/SO pages for the live generation; budget in MB (0 disables)
+RESPONSE_CACHE = ResponseCache(int(float(os.getenv("ERP_RESPONSE_CACHE_MB", "64")) * 1024 * 1024))
+
+def cached_response(view):
+    """
+    Serve a read-only GET route from RESPONSE_CACHE, keyed by path, normalized
+    args, data generation and today's date (ATP dates count from today).
+    Responses carry a strong ETag; a matching If-None-Match gets 304 without
+    rendering anything. ?reload=1 and non-200 responses bypass the cache.
+    """
+    @wraps(view)
+    def wrapper(*args, **kwargs):
+        if request.method != "GET" or request.args.get("reload") == "1":
+            return view(*args, **kwargs)
+        data = _ensure_loaded()
+        if data is None:
+            return view(*args, **kwargs)
+        key = make_key(request.path, request.args, (data.number, data.loaded_at, date.today()))
+        etag = etag_for(key)
+        if etag in request.if_none_match:
+            resp = Response(status=304)
+        else:
+            entry = RESPONSE_CACHE.get(key)
+            if entry is None:
+                fresh = make_response(view(*args, **kwargs))
+                if fresh.status_code != 200 or fresh.direct_passthrough:
+                    return fresh
+                entry = CachedResponse(fresh.get_data(), 200, (("Content-Type", fresh.content_type),), etag)
+                RESPONSE_CACHE.put(key, entry)
+            resp = Response(entry.body, status=entry.status, headers=list(entry.headers))
+        resp.set_etag(etag)
+        # Browsers keep the page but revalidate every time (cheap 304s)
+        resp.headers["Cache-Control"] = "no-cache"
+        return resp
+    return wrapper
 
 def lookup_on_po_by_item(item: str) -> int | None:
-    df = SO_INV[SO_INV["Item"] == item]
+    data = _data()
+    df = data.so_index.item_rows(data.so_inv, item)
     if "On PO" not in df.columns:
         return None
     s = pd.to_numeric(df["On PO"], errors="coerce").dropna()
     return int(s.iloc[0]) if not s.empty else None
 
 def lookup_on_sales_by_item(item: str) -> int | float | None:
-    df = SO_INV[SO_INV["Item"] == item]
+    data = _data()
+    df = data.so_index.item_rows(data.so_inv, item)
     col_name = None
     for candidate in ("On Sales Order", "On Sales", "On SO"):
         if candidate in df.columns:
@@ -372,87 +1028,103 @@ def _aggregate_metric(series: pd.Series) -> int | float | None:
 
 def _lookup_earliest_atp_date(item: str, qty: float = 1.0) -> datetime | None:
     """
-    Best-effort ATP lookup.
-
-    Preferred source: precomputed item_atp (faster, computed in ETL).
-    Fallback: derive from ledger_analytics for the specific item when
-    item_atp is missing or empty.
+    Best-effort ATP lookup against the generation's atp_index, built once per load
+    from ledger_analytics (placeholder dates excluded) or item_atp.
     """
-    today = datetime.today().date()
-    from_date = pd.Timestamp(today)
-
-    # -------- primary: compute from ledger (exclude placeholder dates) --------
-    if LEDGER is None or LEDGER.empty:
-        # fallback to precomputed item_atp if ledger is unavailable
-        if ITEM_ATP is None or ITEM_ATP.empty:
-            return None
-        atp_dt = earliest_atp_strict(ITEM_ATP, item, qty, from_date=from_date, allow_zero=True)
-        if atp_dt is None:
-            return None
-        return atp_dt.to_pydatetime()
-
-    df_ledger = LEDGER.copy()
-    if "Date" in df_ledger.columns:
-        df_ledger["Date"] = pd.to_datetime(df_ledger["Date"], errors="coerce")
-        dummy_dates = {pd.Timestamp("2099-07-04"), pd.Timestamp("2099-12-31")}
-        df_ledger = df_ledger.loc[~df_ledger["Date"].isin(dummy_dates)]
-    atp_view = build_atp_view(df_ledger)
-    atp_dt = earliest_atp_strict(atp_view, item, qty, from_date=from_date, allow_zero=True)
+    data = _data()
+    from_date = pd.Timestamp(datetime.today().date())
+    atp_dt = earliest_atp_from_index(data.atp_index, item, qty, from_date=from_date, allow_zero=True)
     if atp_dt is None:
         return None
     return atp_dt.to_pydatetime()
 
 
-def _find_pdf_url_for_so(so_num: str, po_num: str | None = None) -> str | None:
-    """
-    Best-effort PDF link lookup for a given SO/QB number.
-    Mirrors the logic used on the main index page.
-    """
-    so_num = (so_num or "").strip()
-    if not so_num:
-        return None
-
+def _pdf_search_keys(so_num: str, po_num: str | None = None) -> list[str]:
+    """Filename search terms for an SO, in priority order (see _find_pdf_urls)."""
     search_keys = [so_num]
-    so_upper = so_num.upper()
-    if so_upper.startswith("SO-"):
+    if so_num.upper().startswith("SO-"):
         search_keys.append(so_num[3:])
     if po_num:
         search_keys.append(str(po_num))
+    return search_keys
+
+# For every key: the newest pdf_file_log row whose file_name ILIKE %key%.
+_PDF_IDS_FOR_KEYS_SQL = text(
+    'SELECT k.key, m.id '
+    'FROM unnest(CAST(:keys AS text[])) AS k(key) '
+    'CROSS JOIN LATERAL ('
+    '    SELECT id FROM "public"."pdf_file_log" '
+    '    WHERE file_name ILIKE \'%\' || k.key || \'%\' ORDER BY id DESC LIMIT 1'
+    ') AS m'
+)
 
-    pdf_record = None
-    for key in search_keys:
-        recs = _pdf_db_search_by_filename(key, limit=1)
-        if recs:
-            pdf_record = recs[0]
-            break
+# Same, plus rows whose indexed so_key is the key's SO number (see pdf_log_schema).
+_PDF_IDS_FOR_KEYS_SO_KEY_SQL = text(NEWEST_FOR_KEYS_SQL.replace("{table}", '"public"."pdf_file_log"'))
 
-    if pdf_record:
-        return f"/pdfid/{pdf_record['id']}"
+def _pdf_db_ids_for_keys(keys: list[str]) -> dict[str, int]:
+    """Batched _pdf_db_search_by_filename(key, limit=1): one round trip for all keys."""
+    keys = sorted(set(keys))
+    if not keys:
+        return {}
+    try:
+        with engine.connect() as conn:
+            if _pdf_log_has_so_key():
+                params = {"keys": keys, "so_keys": [so_key_for_query(k) for k in keys]}
+                res = conn.execute(_PDF_IDS_FOR_KEYS_SO_KEY_SQL, params)
+            else:
+                res = conn.execute(_PDF_IDS_FOR_KEYS_SQL, {"keys": keys})
+            return {row.key: int(row.id) for row in res}
+    except Exception:
+        # Table might not exist, or permissions issues; fall back to the folder map
+        return {}
 
-    keys_to_try = [so_num, so_upper.replace("SO-", ""), so_upper.replace("SO", "").strip("- ")]
-    pdf_info = None
-    for k in keys_to_try:
-        pdf_info = PDF_MAP.get(k.upper())
-        if pdf_info:
-            break
+def _folder_pdf_url(so_num: str) -> str | None:
+    pdf_info = _pdf_folder_find(so_num)
     if pdf_info:
         return f"/pdf/{(pdf_info['file_name'][:-4])}"
     return None
 
+def _find_pdf_urls(orders: list[tuple[str, str | None]]) -> dict[tuple[str, str | None], str | None]:
+    """
+    Best-effort PDF links for many (SO/QB number, PO) pairs at once.
+    Mirrors the logic used on the main index page: the first search key with a
+    pdf_file_log match wins (newest record), else the scanned PDF folder.
+    All database lookups go out as a single query.
+    """
+    wanted = {}
+    for so_num, po_num in orders:
+        so = (so_num or "").strip()
+        wanted[(so_num, po_num)] = _pdf_search_keys(so, po_num) if so else []
+    ids = _pdf_db_ids_for_keys([k for keys in wanted.values() for k in keys])
+
+    out: dict[tuple[str, str | None], str | None] = {}
+    for (so_num, po_num), keys in wanted.items():
+        if not keys:
+            out[(so_num, po_num)] = None
+            continue
+        pdf_id = next((ids[k] for k in keys if k in ids), None)
+        out[(so_num, po_num)] = f"/pdfid/{pdf_id}" if pdf_id is not None else _folder_pdf_url(keys[0])
+    return out
+
+def _find_pdf_url_for_so(so_num: str, po_num: str | None = None) -> str | None:
+    """Best-effort PDF link lookup for a single SO/QB number (see _find_pdf_urls)."""
+    return _find_pdf_urls([(so_num, po_num)])[(so_num, po_num)]
+
 def _so_table_for_item(item: str) -> tuple[list[str], list[dict], dict[str, int | float | None]]:
+    data = _data()
     need_cols = ["Name", "QB Num", "Item", "Qty(-)", "On Hand - WIP", "Ship Date", "Picked"]
-    g = SO_INV[SO_INV["Item"] == item].copy()
+    g = data.so_index.item_rows(data.so_inv, item).copy()
     for c in need_cols:
         if c not in g.columns:
             g[c] = ""
     # Fallback for WIP column if missing in data
-    if "On Hand - WIP" not in SO_INV.columns and "In Stock(Inventory)" in SO_INV.columns:
-        g["On Hand - WIP"] = SO_INV.loc[g.index, "In Stock(Inventory)"]
+    if "On Hand - WIP" not in data.so_inv.columns and "In Stock(Inventory)" in data.so_inv.columns:
+        g["On Hand - WIP"] = data.so_inv.loc[g.index, "In Stock(Inventory)"]
     if "Ship Date" in g.columns:
         ship_dates = pd.to_datetime(g["Ship Date"], errors="coerce")
         g = (
             g.assign(_ship_date_sort=ship_dates)
-            .sort_values("_ship_date_sort", na_position="last")
+            .sort_values("_ship_date_sort", na_position="last", kind="stable")
             .drop(columns="_ship_date_sort")
         )
         g["Ship Date"] = _to_date_str(g["Ship Date"])
@@ -466,12 +1138,12 @@ def _so_table_for_item(item: str) -> tuple[list[str], list[dict], dict[str, int
     return need_cols, rows, totals
 
 def _so_table_for_so(so_num: str, item: str | None = None) -> tuple[list[str], list[dict]]:
+    data = _data()
     need_cols = ["Name", "QB Num", "Item", "Qty(-)", "On Hand - WIP", "Ship Date", "Picked"]
-    g = SO_INV.copy()
-    mask = g["QB Num"].astype(str).str.upper() == so_num.upper()
     if item:
-        mask &= g["Item"].astype(str) == item
-    g = g.loc[mask].copy()
+        g = data.so_index.item_so_rows(data.so_inv, item, so_num).copy()
+    else:
+        g = data.so_index.so_rows(data.so_inv, so_num).copy()
     for c in need_cols:
         if c not in g.columns:
             g[c] = ""
@@ -482,7 +1154,7 @@ def _so_table_for_so(so_num: str, item: str | None = None) -> tuple[list[str], l
         ship_dates = pd.to_datetime(g["Ship Date"], errors="coerce")
         g = (
             g.assign(_ship_date_sort=ship_dates)
-            .sort_values("_ship_date_sort", na_position="last")
+            .sort_values("_ship_date_sort", na_position="last", kind="stable")
             .drop(columns="_ship_date_sort")
         )
         g["Ship Date"] = _to_date_str(g["Ship Date"])
@@ -499,48 +1171,48 @@ def _compute_on_hand_metrics(df: pd.DataFrame) -> tuple[int | float | None, int
     return on_hand, on_hand_wip
 
 def _po_table_for_item(item: str) -> tuple[list[str], list[dict]]:
-    if "Item" not in NAV.columns:
+    data = _data()
+    if "Item" not in data.nav.columns:
         raise ValueError("NAV table missing 'Item' column.")
     item_lower = item.lower()
     item_upper = item.upper()
-    nav_item_series = NAV["Item"].astype(str)
-    mask = nav_item_series.str.lower() == item_lower
+    pos = data.nav_item_index.positions(item_lower)
     allow_desc_lookup = not item_upper.startswith(("N", "SEMIL", "POC"))
-    if allow_desc_lookup and "Description" in NAV.columns:
-        desc_mask = NAV["Description"].astype(str).str.lower().str.contains(item_lower, na=False)
-        mask |= desc_mask
-    g = NAV[mask].copy()
+    if allow_desc_lookup and data.nav_desc_index is not None:
+        pos = np.union1d(pos, data.nav_desc_index.positions(item_lower))
+    g = data.nav.iloc[pos].copy()
     for dc in ("Ship Date", "Order Date", "ETA"):
         if dc in g.columns:
             g[dc] = _to_date_str(g[dc])
-    cols = list(g.columns) if not g.empty else list(NAV.columns)
+    cols = list(g.columns) if not g.empty else list(data.nav.columns)
     g = g.fillna("").astype(str)
     rows = g[cols].to_dict(orient="records") if not g.empty else []
     return cols, rows
 
 def _open_po_table_for_item(item: str) -> tuple[list[str], list[dict]]:
-    if OPEN_PO is None or OPEN_PO.empty:
+    data = _data()
+    if data.open_po is None or data.open_po.empty:
         return [], []
 
     item_lower = item.lower()
     item_upper = item.upper()
 
-    df = OPEN_PO
+    df = data.open_po
     item_col = next((c for c in df.columns if c.lower() == "item"), None)
     desc_col = next((c for c in df.columns if c.lower() == "description"), None)
 
     if item_col is None and desc_col is None:
         return list(df.columns), []
 
-    mask = pd.Series(False, index=df.index)
+    pos = np.empty(0, dtype=np.intp)
     if item_col:
-        mask |= df[item_col].astype(str).str.lower() == item_lower
+        pos = data.open_po_item_index.positions(item_lower)
 
     allow_desc_lookup = not item_upper.startswith(("N", "SEMIL", "POC"))
     if allow_desc_lookup and desc_col:
-        mask |= df[desc_col].astype(str).str.lower().str.contains(item_lower, na=False)
+        pos = np.union1d(pos, data.open_po_desc_index.positions(item_lower))
 
-    result = df.loc[mask].copy()
+    result = df.iloc[pos].copy()
     if result.empty:
         return list(df.columns), []
 
@@ -551,20 +1223,229 @@ def _open_po_table_for_item(item: str) -> tuple[list[str], list[dict]]:
     result = result.fillna("").astype(str)
     return list(result.columns), result.to_dict(orient="records")
 
-# initial load
+# ---------- precomputed /api/item_overview payloads (optional) ----------
+# Set ERP_PRECOMPUTE_OVERVIEW=1 to build every item's overview JSON at load
+# time; the endpoint then only decompresses. Output is byte-identical to the
+# on-demand handlers above (items it cannot reproduce exactly are left out
+# and served on demand).
+PRECOMPUTE_OVERVIEW = os.getenv("ERP_PRECOMPUTE_OVERVIEW", "0") == "1"
+
+@dataclass(frozen=True)
+class OverviewPayloads:
+    blobs: dict[str, bytes]      # item -> zlib(JSON body)
+    raw_bytes: int
+    build_seconds: float
+
+    def get(self, item: str) -> bytes | None:
+        blob = self.blobs.get(item)
+        return zlib.decompress(blob) if blob is not None else None
+
+    @property
+    def nbytes(self) -> int:
+        return sum(len(b) for b in self.blobs.values())
+
+class _RowFormatter:
+    """
+    Rows of `df` as {column: str}, exactly as the handlers render a slice:
+    optional date step, then fillna("").astype(str). Columns where that gives
+    the same string per value whatever the slice are formatted once; the rest
+    (datetime columns, date parsing of text, categoricals without a ""
+    category) per slice.
+    """
+
+    def __init__(self, df: pd.DataFrame, date_str_cols=(), parse_date_cols=()):
+        self.df = df
+        self.columns = list(df.columns)
+        self._date_str = set(date_str_cols)
+        self._parse = set(parse_date_cols)
+        self._whole: dict[str, np.ndarray] = {}
+        for c in self.columns:
+            col = df[c]
+            if c in self._parse:
+                continue
+            if c in self._date_str:
+                if pd.api.types.is_datetime64_any_dtype(col):
+                    self._whole[c] = _to_date_str(col).to_numpy(dtype=object)
+                continue
+            if isinstance(col.dtype, pd.CategoricalDtype):
+                # fillna("") raises unless "" is a category (frame_schema always adds it)
+                if "" in col.cat.categories:
+                    self._whole[c] = col.fillna("").astype(str).to_numpy(dtype=object)
+            elif col.dtype == object or pd.api.types.is_numeric_dtype(col) or pd.api.types.is_string_dtype(col):
+                self._whole[c] = col.fillna("").astype(str).to_numpy(dtype=object)
+        self._sliced = [c for c in self.columns if c not in self._whole]
+
+    def rows(self, pos: np.ndarray) -> list[dict]:
+        vals = {c: self._whole[c][pos] for c in self._whole}
+        if self._sliced:
+            sub = self.df.iloc[pos][self._sliced].copy()
+            for c in self._sliced:
+                if c in self._date_str:
+                    sub[c] = _to_date_str(sub[c])
+                elif c in self._parse:
+                    _safe_date_col(sub, c)
+            sub = sub.fillna("").astype(str)
+            for c in self._sliced:
+                vals[c] = sub[c].to_numpy(dtype=object)
+        cols = [vals[c] for c in self.columns]
+        return [dict(zip(self.columns, row)) for row in zip(*cols)]
+
+def _numeric_or_none(df: pd.DataFrame, col: str) -> np.ndarray | None:
+    if col not in df.columns:
+        return None
+    return pd.to_numeric(df[col], errors="coerce").to_numpy(dtype=float)
+
+def _aggregate_values(vals: np.ndarray) -> int | float | None:
+    # _aggregate_metric on an already numeric slice
+    vals = vals[~np.isnan(vals)]
+    if not len(vals):
+        return None
+    first = vals[0]
+    if (vals == first).all():
+        return _coerce_total(first)
+    return _coerce_total(vals.sum())
+
+def _build_overview_payloads(
+    so: pd.DataFrame,
+    nav: pd.DataFrame,
+    open_po: pd.DataFrame,
+    so_index: SoIndex,
+    nav_item_index: RowIndex | None,
+    open_po_item_index: RowIndex | None,
+    nav_desc: DescriptionIndex | None,
+    op_desc: DescriptionIndex | None,
+) -> OverviewPayloads | None:
+    """Every item's /api/item_overview body, in one pass over the loaded frames."""
+    if "Item" not in nav.columns or nav_item_index is None:
+        return None  # the endpoint reports that error itself
+    t0 = time.perf_counter()
+
+    # SO lines (_so_table_for_item)
+    so_cols = ["Name", "QB Num", "Item", "Qty(-)", "On Hand - WIP", "Ship Date", "Picked"]
+    so_src = pd.DataFrame({c: so[c] if c in so.columns else "" for c in so_cols}, index=so.index)
+    if "On Hand - WIP" not in so.columns and "In Stock(Inventory)" in so.columns:
+        so_src["On Hand - WIP"] = so["In Stock(Inventory)"]
+    so_src = so_src.reset_index(drop=True)
+    so_fmt = _RowFormatter(so_src, date_str_cols=["Ship Date"])
+    ship = so_src["Ship Date"]
+    ship_key = None
+    if pd.api.types.is_datetime64_any_dtype(ship):
+        ship_key = _ship_sort_key(ship)
+    on_sales = _numeric_or_none(so, "On Sales Order")
+    on_po = _numeric_or_none(so, "On PO")
+
+    # NAV lines (_po_table_for_item)
+    nav_fmt = _RowFormatter(nav.reset_index(drop=True), date_str_cols=[c for c in ("Ship Date", "Order Date", "ETA") if c in nav.columns])
+
+    # Open POs (_open_po_table_for_item)
+    op = open_po if open_po is not None else pd.DataFrame()
+    op_item_col = next((c for c in op.columns if c.lower() == "item"), None)
+    op_desc_col = next((c for c in op.columns if c.lower() == "description"), None)
+    op_fmt = None
+    if not op.empty:
+        op_fmt = _RowFormatter(op.reset_index(drop=True), parse_date_cols=[c for c in op.columns if "date" in c.lower()])
+
+    names = [so["Item"] if "Item" in so.columns else None, nav["Item"], op[op_item_col] if op_item_col else None]
+    items = pd.unique(pd.concat([n.astype(str) for n in names if n is not None], ignore_index=True))
+
+    blobs: dict[str, bytes] = {}
+    raw = 0
+    for item in items:
+        if not item or item != item.strip():
+            continue  # the endpoint strips its argument
+        item_lower = item.lower()
+        allow_desc_lookup = not item.upper().startswith(("N", "SEMIL", "POC"))
+        try:
+            so_pos = so_index.by_item.positions(item)
+            if len(so_pos):
+                key = ship_key[so_pos] if ship_key is not None else _ship_sort_key(ship.iloc[so_pos])
+                sorted_pos = so_pos[np.argsort(key, kind="stable")]
+                rows_so = so_fmt.rows(sorted_pos)
+                total_sales = _aggregate_values(on_sales[sorted_pos]) if on_sales is not None else None
+                total_po = _aggregate_values(on_po[sorted_pos]) if on_po is not None else None
+            else:
+                rows_so, total_sales, total_po = [], None, None
+            on_po_label = None
+            if on_po is not None:
+                first_po = on_po[so_pos][~np.isnan(on_po[so_pos])]
+                on_po_label = int(first_po[0]) if len(first_po) else None
+
+            pos = nav_item_index.positions(item_lower)
+            if allow_desc_lookup and nav_desc is not None:
+                pos = np.union1d(pos, nav_desc.positions(item_lower))
+            rows_po = nav_fmt.rows(pos) if len(pos) else []
+
+            if op.empty:
+                open_po_cols, open_po_rows = [], []
+            elif op_item_col is None and op_desc_col is None:
+                open_po_cols, open_po_rows = list(op.columns), []
+            else:
+                pos = open_po_item_index.positions(item_lower) if op_item_col else np.empty(0, dtype=np.intp)
+                if allow_desc_lookup and op_desc is not None:
+                    pos = np.union1d(pos, op_desc.positions(item_lower))
+                open_po_cols = list(op.columns)
+                open_po_rows = op_fmt.rows(pos) if len(pos) else []
+        except Exception:
+            continue  # e.g. an item that is not a valid regex: leave it to the handler
+
+        payload = {
+            "ok": True,
+            "item": item,
+            "so": {
+                "columns": so_cols,
+                "rows": rows_so,
+                "total_on_sales": total_sales,
+                "total_on_po": total_po,
+            },
+            "po": {
+                "columns": list(nav.columns),
+                "rows": rows_po,
+            },
+            "open_po": {
+                "columns": open_po_cols,
+                "rows": open_po_rows,
+            },
+            "on_po_label": on_po_label,
+        }
+        body = app.json.response(payload).get_data()
+        raw += len(body)
+        blobs[item] = zlib.compress(body, 6)
+
+    out = OverviewPayloads(blobs=blobs, raw_bytes=raw, build_seconds=time.perf_counter() - t0)
+    print(
+        f"[load] item overview: {len(blobs)} items, {out.nbytes / 1e6:.1f} MB compressed "
+        f"({raw / 1e6:.1f} MB JSON) in {out.build_seconds:.2f}s"
+    )
+    return out
+
+def _ship_sort_key(ship: pd.Series) -> np.ndarray:
+    # Ship Date as int64 with NaT sorted last, for a stable argsort
+    key = pd.to_datetime(ship, errors="coerce").to_numpy(dtype="datetime64[ns]").view("i8").copy()
+    key[key == np.iinfo(np.int64).min] = np.iinfo(np.int64).max
+    return key
+
+# initial load: tables are read on first use. ERP_PRELOAD=all (or a comma
+# list of parts: so, nav, open_po, atp, final_so, suggest, overview) reads them now.
 _load_from_db(force=True)
+_PRELOAD = os.getenv("ERP_PRELOAD", "").strip()
+if _PRELOAD:
+    try:
+        preload(None if _PRELOAD == "all" else [p.strip() for p in _PRELOAD.split(",")])
+    except TableLoadError:
+        pass
 
 # =========================
 # Routes
 # =========================
 @app.route("/", methods=["GET", "POST"])
+@cached_response
 def index():
     if request.args.get("reload") == "1":
         _load_from_db(force=True)
         _load_pdf_map(force=True)
-    _ensure_loaded()
-    if _LAST_LOAD_ERR:
-        return render_template_string(ERR_TPL, error=_LAST_LOAD_ERR), 503
+    data = _ensure_loaded()
+    if data is None:
+        return render_template_string(ERR_TPL, error=_load_error()), 503
 
     # ---- read inputs (work with GET or POST) ----
     so_input = (request.values.get("so") or "").strip()
@@ -590,12 +1471,10 @@ def index():
         rows_df = pd.DataFrame()
 
         if so_num:
-            mask = SO_INV["QB Num"].astype(str).str.upper() == so_num
-            rows_df = SO_INV.loc[mask].copy()
+            rows_df = data.so_index.so_rows(data.so_inv, so_num).copy()
 
-        if (rows_df is None or rows_df.empty) and "Name" in SO_INV.columns:
-            name_mask = SO_INV["Name"].astype(str).str.contains(so_input, case=False, na=False)
-            rows_df = SO_INV.loc[name_mask].copy()
+        if (rows_df is None or rows_df.empty) and "Name" in data.so_inv.columns:
+            rows_df = data.so_index.name_rows(data.so_inv, so_input).copy()
 
         count = len(rows_df)
 
@@ -658,15 +1537,8 @@ def index():
             order_summary["pdf_url"] = f"/pdfid/{pdf_record['id']}"
             order_summary["pdf_name"] = pdf_record.get("file_name")
         else:
-            # Fallback to filesystem map (exact filename stems)
-            keys_to_try = []
-            if qb_for_pdf:
-                keys_to_try = [qb_for_pdf, qb_for_pdf.replace("SO-", ""), qb_for_pdf.replace("SO", "").strip("- ")]
-            pdf_info = None
-            for k in keys_to_try:
-                pdf_info = PDF_MAP.get(k.upper())
-                if pdf_info:
-                    break
+            # Fallback to the PDF folder index (filename stems)
+            pdf_info = _pdf_folder_find(qb_for_pdf) if qb_for_pdf else None
             if pdf_info:
                 order_summary["pdf_url"] = f"/pdf/{(pdf_info['file_name'][:-4])}"
                 order_summary["pdf_name"] = pdf_info["file_name"]
@@ -679,16 +1551,15 @@ def index():
     elif customer_input:
         customer_query = customer_input
         customer_options = []
-        if "Name" in SO_INV.columns:
-            name_mask = SO_INV["Name"].astype(str).str.contains(customer_input, case=False, na=False)
-            cust_df = SO_INV.loc[name_mask].copy()
+        if "Name" in data.so_inv.columns:
+            cust_df = data.so_index.name_rows(data.so_inv, customer_input).copy()
             if not cust_df.empty:
                 if "QB Num" not in cust_df.columns:
                     cust_df["QB Num"] = ""
                 for c in ("Ship Date", "Order Date"):
                     if c in cust_df.columns:
                         cust_df[c] = _to_date_str(cust_df[c])
-                for qb_num, grp in cust_df.groupby("QB Num"):
+                for qb_num, grp in cust_df.groupby("QB Num", observed=True):
                     qb_str = str(qb_num).strip()
                     if not qb_str:
                         continue
@@ -709,7 +1580,7 @@ def index():
         customer_options=customer_options,
         rows=rows,
         count=count,
-        loaded_at=_LAST_LOADED_AT.strftime("%Y-%m-%d %H:%M:%S") if _LAST_LOADED_AT else "—",
+        loaded_at=data.loaded_at.strftime("%Y-%m-%d %H:%M:%S"),
         order_summary=order_summary,
         headers=table_headers,
         header_labels=TABLE_HEADER_LABELS,
@@ -722,11 +1593,49 @@ def index():
 
 @app.route("/api/reload", methods=["POST"])
 def api_reload():
-    _load_from_db(force=True)
+    """
+    Start a new generation, re-reading the tables that changed (see
+    _load_from_db). Pages keep serving the previous generation while this
+    runs, and keep it if the reload fails.
+    ?async=1 returns 202 at once and reloads on a worker thread.
+    """
     _load_pdf_map(force=True)
+    if request.args.get("async") == "1":
+        return jsonify({"ok": True, "started": reload_in_background()}), 202
+    _load_from_db(force=True)
+    data = _repin()
     if _LAST_LOAD_ERR:
-        return jsonify({"ok": False, "error": _LAST_LOAD_ERR}), 500
-    return jsonify({"ok": True, "loaded_at": _LAST_LOADED_AT.isoformat()})
+        body = {"ok": False, "error": _LAST_LOAD_ERR}
+        if data is not None:
+            body["serving"] = {"generation": data.number, "loaded_at": data.loaded_at.isoformat()}
+        return jsonify(body), 500
+    return jsonify({
+        "ok": True,
+        "generation": data.number,
+        "loaded_at": data.loaded_at.isoformat(),
+        "source": data.source,
+        "version": data.source_version,
+    })
+
+@app.route("/readyz")
+def readyz():
+    """
+    Readiness probe: 200 once a generation is live (never triggers a load).
+    Its tables load on first use unless preloaded (ERP_PRELOAD); "loaded"
+    lists the parts read so far.
+    """
+    data = _GENERATIONS.current
+    if data is None:
+        return jsonify({"ok": False, "error": _load_error()}), 503
+    return jsonify({
+        "ok": True,
+        "generation": data.number,
+        "loaded_at": data.loaded_at.isoformat(),
+        "source": data.source,
+        "loaded": data.loaded_parts(),
+        "pid": os.getpid(),
+        "response_cache": RESPONSE_CACHE.stats(),
+    })
 
 @app.route("/pdf/<order_id>")
 def serve_pdf(order_id: str):
@@ -735,14 +1644,8 @@ def serve_pdf(order_id: str):
     _load_pdf_map()
     if not PDF_FOLDER:
         abort(404)
-    info = PDF_MAP.get(order_id.upper())
-    if not info:
-        # try variants: with SO- prefix or stripped
-        variants = [order_id, f"SO-{order_id}", order_id.replace("SO-", ""), order_id.replace("SO", "").strip("- ")]
-        for v in variants:
-            info = PDF_MAP.get(v.upper())
-            if info:
-                break
+    # exact stem first, then with SO- prefix or stripped
+    info = _pdf_folder_find(order_id)
     if not info:
         abort(404)
     path = info["file_path"]
@@ -788,15 +1691,20 @@ def api_pdf_search():
     return jsonify({"ok": True, "count": len(rows), "rows": rows})
 
 @app.route("/api/item_overview")
+@cached_response
 def api_item_overview():
-    _ensure_loaded()
-    if _LAST_LOAD_ERR:
-        return jsonify({"ok": False, "error": _LAST_LOAD_ERR}), 503
+    data = _ensure_loaded()
+    if data is None:
+        return jsonify({"ok": False, "error": _load_error()}), 503
 
     item = (request.args.get("item") or "").strip()
     if not item:
         abort(400, "Missing item")
 
+    body = data.overview.get(item) if data.overview is not None else None
+    if body is not None:
+        return Response(body, mimetype=app.json.mimetype)
+
     columns_so, rows_so, so_totals = _so_table_for_item(item)
     try:
         columns_po, rows_po = _po_table_for_item(item)
@@ -829,10 +1737,11 @@ def api_item_overview():
     )
 
 @app.route("/so_lines")
+@cached_response
 def so_lines():
-    _ensure_loaded()
-    if _LAST_LOAD_ERR:
-        return render_template_string(ERR_TPL, error=_LAST_LOAD_ERR), 503
+    data = _ensure_loaded()
+    if data is None:
+        return render_template_string(ERR_TPL, error=_load_error()), 503
 
     item = (request.args.get("item") or "").strip()
     if not item:
@@ -855,10 +1764,11 @@ def so_lines():
     )
 
 @app.route("/po_lines")
+@cached_response
 def po_lines():
-    _ensure_loaded()
-    if _LAST_LOAD_ERR:
-        return render_template_string(ERR_TPL, error=_LAST_LOAD_ERR), 503
+    data = _ensure_loaded()
+    if data is None:
+        return render_template_string(ERR_TPL, error=_load_error()), 503
 
     item = (request.args.get("item") or "").strip()
     if not item:
@@ -885,10 +1795,11 @@ def po_lines():
     )
 
 @app.route("/item_details")
+@cached_response
 def item_details():
-    _ensure_loaded()
-    if _LAST_LOAD_ERR:
-        return render_template_string(ERR_TPL, error=_LAST_LOAD_ERR), 503
+    data = _ensure_loaded()
+    if data is None:
+        return render_template_string(ERR_TPL, error=_load_error()), 503
 
     item = (request.args.get("item") or "").strip()
     if not item:
@@ -922,12 +1833,13 @@ def item_details():
 
 @app.route("/inventory_count")
 def inventory_count():
-    _ensure_loaded()
-    if _LAST_LOAD_ERR:
-        return render_template_string(ERR_TPL, error=_LAST_LOAD_ERR), 503
+    data = _ensure_loaded()
+    if data is None:
+        return render_template_string(ERR_TPL, error=_load_error()), 503
 
     if request.args.get("reload") == "1":
         _load_from_db(force=True)
+        data = _repin()
 
     so_input = (request.values.get("so") or "").strip()
     item_input = (request.values.get("item") or "").strip()
@@ -943,11 +1855,14 @@ def inventory_count():
     open_po_columns: list[str] | None = None
     open_po_rows: list[dict] | None = None
 
-    filtered_df = SO_INV.copy()
-    if item_input:
-        filtered_df = filtered_df[filtered_df["Item"].astype(str) == item_input]
-    if so_num:
-        filtered_df = filtered_df[filtered_df["QB Num"].astype(str).str.upper() == so_num]
+    if item_input and so_num:
+        filtered_df = data.so_index.item_so_rows(data.so_inv, item_input, so_num)
+    elif item_input:
+        filtered_df = data.so_index.item_rows(data.so_inv, item_input)
+    elif so_num:
+        filtered_df = data.so_index.so_rows(data.so_inv, so_num)
+    else:
+        filtered_df = data.so_inv
 
     if not filtered_df.empty:
         on_hand, on_hand_wip = _compute_on_hand_metrics(filtered_df)
@@ -985,7 +1900,7 @@ def inventory_count():
 
     return render_template_string(
         INVENTORY_TPL,
-        loaded_at=_LAST_LOADED_AT.strftime("%Y-%m-%d %H:%M:%S") if _LAST_LOADED_AT else "�?",
+        loaded_at=data.loaded_at.strftime("%Y-%m-%d %H:%M:%S"),
         so_val=so_input,
         item_val=item_input,
         on_hand=on_hand,
@@ -999,17 +1914,18 @@ def inventory_count():
 
 @app.route("/production_planning")
 def production_planning():
-    _ensure_loaded()
-    if _LAST_LOAD_ERR:
-        return render_template_string(ERR_TPL, error=_LAST_LOAD_ERR), 503
+    data = _ensure_loaded()
+    if data is None:
+        return render_template_string(ERR_TPL, error=_load_error()), 503
 
     if request.args.get("reload") == "1":
         _load_from_db(force=True)
+        data = _repin()
 
-    if FINAL_SO is None or FINAL_SO.empty:
+    if data.final_so is None or data.final_so.empty:
         return render_template_string(ERR_TPL, error="No final_sales_order data available."), 503
 
-    df = FINAL_SO.copy()
+    df = data.final_so.copy()
     if "Lead Time" not in df.columns:
         return render_template_string(ERR_TPL, error="final_sales_order missing 'Lead Time' column."), 500
 
@@ -1025,7 +1941,7 @@ def production_planning():
         "lead_date_str", sort=True
     ):
         orders: list[dict] = []
-        for qb_num, so_group in date_group.groupby("QB Num"):
+        for qb_num, so_group in date_group.groupby("QB Num", observed=True):
             first = so_group.iloc[0]
             customer = first.get("Customer") or first.get("Name") or ""
             qty_val = first.get("Qty")
@@ -1037,13 +1953,12 @@ def production_planning():
             item_name = first.get("Item") or ""
             line = f"{item_name} x {qty_str}".strip()
             po_num = first.get("Customer PO") or first.get("P. O. #") or ""
-            pdf_url = _find_pdf_url_for_so(str(qb_num), po_num)
             orders.append(
                 {
                     "qb_num": str(qb_num),
                     "customer": customer,
                     "line": line,
-                    "pdf_url": pdf_url,
+                    "pdf_key": (str(qb_num), po_num),
                 }
             )
         orders.sort(key=lambda r: r["qb_num"])
@@ -1051,33 +1966,36 @@ def production_planning():
 
     date_groups.sort(key=lambda g: g["date"])
 
+    # Resolve every order's PDF in one pass instead of one lookup per order
+    all_orders = [o for g in date_groups for o in g["orders"]]
+    pdf_urls = _find_pdf_urls([o["pdf_key"] for o in all_orders])
+    for o in all_orders:
+        o["pdf_url"] = pdf_urls[o.pop("pdf_key")]
+
     return render_template_string(
         PRODUCTION_TPL,
-        loaded_at=_LAST_LOADED_AT.strftime("%Y-%m-%d %H:%M:%S") if _LAST_LOADED_AT else "",
+        loaded_at=data.loaded_at.strftime("%Y-%m-%d %H:%M:%S"),
         date_groups=date_groups,
     )
 
 @app.route("/api/item_suggest")
 def api_item_suggest():
-    _ensure_loaded()
+    data = _ensure_loaded()
     q = (request.args.get("q") or request.args.get("query") or "").strip()
     if not q:
         return jsonify({"ok": True, "items": []})
+    if data is None:
+        return jsonify({"ok": False, "error": _load_error()}), 503
     try:
-        items = SO_INV["Item"].astype(str).dropna().unique().tolist()
-        ql = q.lower()
-        starts = [i for i in items if i.lower().startswith(ql)]
-        contains = [i for i in items if ql in i.lower() and i not in starts]
-        out = (starts + contains)[:20]
-        return jsonify({"ok": True, "items": out})
+        return jsonify({"ok": True, "items": data.suggest_index.suggest(q, limit=20)})
     except Exception as e:
             return jsonify({"ok": False, "error": str(e)}), 500
 
 @app.route("/quotation_lookup")
 def quotation_lookup():
-    _ensure_loaded()
-    if _LAST_LOAD_ERR:
-        return render_template_string(ERR_TPL, error=_LAST_LOAD_ERR), 503
+    data = _ensure_loaded()
+    if data is None:
+        return render_template_string(ERR_TPL, error=_load_error()), 503
 
     item_input = (request.values.get("item") or "").strip()
     qty_raw = (request.values.get("qty") or "").strip()
@@ -1093,9 +2011,8 @@ def quotation_lookup():
     opening_qty = None
     earliest_atp = None
 
-    if item_input and LEDGER is not None and not LEDGER.empty:
-        df = LEDGER.copy()
-        df_item = df.loc[df["Item"].astype(str) == item_input].copy()
+    if item_input and data.ledger is not None and not data.ledger.empty and data.ledger_item_index is not None:
+        df_item = data.ledger_item_index.take(data.ledger, item_input).copy()
         if not df_item.empty:
             # Opening snapshot:
             # 1) Prefer explicit OPEN rows; 2) if none, fall back to any Opening values.
@@ -1182,11 +2099,98 @@ def quotation_lookup():
         earliest_atp=earliest_atp,
         ledger_columns=ledger_columns,
         ledger_rows=ledger_rows,
-        loaded_at=_LAST_LOADED_AT.strftime("%Y-%m-%d %H:%M:%S") if _LAST_LOADED_AT else "",
+        loaded_at=data.loaded_at.strftime("%Y-%m-%d %H:%M:%S"),
     )
 
+def _parse_quote_lines(lines) -> list[tuple[str, float]]:
+    if not isinstance(lines, list):
+        raise ValueError("lines must be a list of {item, qty} objects.")
+    out = []
+    for ln in lines:
+        if not isinstance(ln, dict):
+            raise ValueError("each line must be an object with 'item' and 'qty'.")
+        item = str(ln.get("item") or "").strip()
+        if not item:
+            raise ValueError("each line needs a non-empty 'item'.")
+        try:
+            qty = float(ln.get("qty", 1))
+        except (TypeError, ValueError):
+            raise ValueError(f"invalid qty for item {item!r}.")
+        out.append((item, qty if qty > 0 else 1.0))
+    return out
+
+def _date_or_none(ts) -> str | None:
+    return ts.strftime("%Y-%m-%d") if ts is not None else None
+
+@app.route("/api/quotation_atp", methods=["POST"])
+def api_quotation_atp():
+    """
+    Batch earliest-ATP lookup for the quoting tool.
+
+    Body: {"lines": [{"item": ..., "qty": ...}, ...]} for one quote, or
+          {"quotes": {"<quote id>": [lines...], ...}} for many.
+    Optional: "from_date" (YYYY-MM-DD, default today), "allow_zero" (a JSON
+    boolean, default true). Anything else in the wrong shape is a 400.
+    """
+    data = _ensure_loaded()
+    if data is None:
+        return jsonify({"ok": False, "error": _load_error()}), 503
+
+    payload = request.get_json(silent=True)
+    if payload is None:
+        payload = {}
+    if not isinstance(payload, dict):
+        return jsonify({"ok": False, "error": "body must be a JSON object."}), 400
+    single = "quotes" not in payload
+    try:
+        if single:
+            quotes = {"quote": _parse_quote_lines(payload.get("lines"))}
+        else:
+            raw = payload.get("quotes")
+            if not isinstance(raw, dict):
+                raise ValueError("quotes must be an object of quote id -> lines.")
+            quotes = {str(qid): _parse_quote_lines(lines) for qid, lines in raw.items()}
+        raw_date = payload.get("from_date")
+        if raw_date is not None and not isinstance(raw_date, str):
+            raise ValueError("from_date must be a YYYY-MM-DD string.")
+        from_date = pd.Timestamp(raw_date or datetime.today().date())
+        allow_zero = payload.get("allow_zero", True)
+        if not isinstance(allow_zero, bool):
+            raise ValueError("allow_zero must be true or false.")
+    except ValueError as exc:
+        return jsonify({"ok": False, "error": str(exc)}), 400
+
+    answers = earliest_atp_for_quotes(data.atp_index, quotes, from_date, allow_zero=allow_zero)
+
+    results = {}
+    for qid, (quote_date, item_dates) in answers.items():
+        qty_by_item: dict[str, float] = {}
+        for itm, qty in quotes[qid]:
+            qty_by_item[itm] = qty_by_item.get(itm, 0.0) + qty
+        results[qid] = {
+            "earliest_atp": _date_or_none(quote_date),
+            "lines": [
+                {"item": itm, "qty": qty_by_item[itm], "earliest_atp": _date_or_none(d)}
+                for itm, d in item_dates.items()
+            ],
+        }
+
+    body = {
+        "ok": True,
+        "from_date": from_date.strftime("%Y-%m-%d"),
+        "loaded_at": data.loaded_at.isoformat(),
+    }
+    if single:
+        body.update(results["quote"])
+    else:
+        body["quotes"] = results
+    return jsonify(body)
+
 if __name__ == "__main__":
-    # Flask dev server
-    # Preload PDF map on startup for faster first-hit
+    # Flask dev server (debugger on); production runs wsgi.py (gunicorn or waitress)
+    # Open the PDF folder index on startup for faster first-hit
     _load_pdf_map(force=True)
+    # With the debug reloader only the child process serves requests
+    if os.environ.get("WERKZEUG_RUN_MAIN") == "true":
+        start_background_tasks()
     app.run(debug=True, host="0.0.0.0", port=5002)
@@ -0,0 +1,47 @@
+"""
+Production entry point for the ERP web app.
+
+Linux (pre-forked workers, data loaded once in the master and shared
+copy-on-write; see gunicorn.conf.py):
+
+    cd Webpage && gunicorn -c gunicorn.conf.py wsgi:app
+
+Windows, or anywhere gunicorn is unavailable (one process, a thread pool):
+
+    python Webpage/wsgi.py [--host 0.0.0.0] [--port 5002] [--threads 16]
+
+Importing `server` starts the first data generation, so `app` is ready to
+serve as soon as this module is imported; tables are read on first use
+unless ERP_PRELOAD says otherwise. Probe /readyz for readiness.
+"""
+from __future__ import annotations
+
+import argparse
+import os
+
+from server import app, start_background_tasks
+
+DEFAULT_HOST = os.getenv("ERP_HOST", "0.0.0.0")
+DEFAULT_PORT = int(os.getenv("ERP_PORT", "5002"))
+DEFAULT_THREADS = int(os.getenv("ERP_THREADS", "16"))
+
+
+def serve_waitress(host: str = DEFAULT_HOST, port: int = DEFAULT_PORT, threads: int = DEFAULT_THREADS):
+    from waitress import serve
+
+    start_background_tasks()
+    print(f"[wsgi] waitress on http://{host}:{port} ({threads} threads)")
+    serve(app, host=host, port=port, threads=threads)
+
+
+def main():
+    ap = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    ap.add_argument("--host", default=DEFAULT_HOST)
+    ap.add_argument("--port", type=int, default=DEFAULT_PORT)
+    ap.add_argument("--threads", type=int, default=DEFAULT_THREADS)
+    args = ap.parse_args()
+    serve_waitress(args.host, args.port, args.threads)
+
+
+if __name__ == "__main__":
+    main()